@@ -13,4 +13,6 @@ from django.core.asgi import get_asgi_application
 
 os.environ.setdefault("DJANGO_SETTINGS_MODULE", "config.settings")
 
+# long-lived streams (e.g. `GET /food/orders/<id>/events`) are served by
+# this entry point as coroutines, one per connection, without a thread
 application = get_asgi_application()
@@ -1,7 +1,10 @@
+import importlib.util
 import os
 from datetime import timedelta
 from pathlib import Path
 
+from django.core.exceptions import ImproperlyConfigured
+
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
 BASE_DIR = Path(__file__).resolve().parent.parent
 
@@ -41,6 +44,11 @@ MIDDLEWARE = [
     "django.middleware.clickjacking.XFrameOptionsMiddleware",
 ]
 
+# X-DB-Queries, X-Redis-Calls & Server-Timing headers, for load tests only
+REQUEST_METRICS = bool(os.getenv("DJANGO_REQUEST_METRICS", ""))
+if REQUEST_METRICS:
+    MIDDLEWARE.insert(0, "shared.metrics.RequestMetricsMiddleware")
+
 ROOT_URLCONF = "config.urls"
 
 TEMPLATES = [
@@ -95,6 +103,44 @@ AUTH_PASSWORD_VALIDATORS = [
     },
 ]
 
+# Password hashing
+# the first hasher hashes new passwords, others only verify existing hashes,
+# which are re-hashed with the first one on the next successful login.
+# Compare the cost on the target hardware: `python manage.py benchmark_hashers`
+
+PASSWORD_HASHER = os.getenv("DJANGO_PASSWORD_HASHER", default="argon2")
+_PASSWORD_HASHERS = {
+    "argon2": "users.hashers.Argon2PasswordHasher",  # requires `argon2-cffi`
+    "scrypt": "users.hashers.ScryptPasswordHasher",
+    "pbkdf2": "users.hashers.PBKDF2PasswordHasher",
+}
+if PASSWORD_HASHER not in _PASSWORD_HASHERS:
+    raise ImproperlyConfigured(
+        f"DJANGO_PASSWORD_HASHER={PASSWORD_HASHER!r} is not supported, "
+        f"use one of: {', '.join(_PASSWORD_HASHERS)}"
+    )
+PASSWORD_HASHERS = [
+    _PASSWORD_HASHERS[PASSWORD_HASHER],
+    *(path for name, path in _PASSWORD_HASHERS.items() if name != PASSWORD_HASHER),
+]
+
+# OWASP recommended minimums, memory cost is in KiB
+PASSWORD_ARGON2_TIME_COST = int(os.getenv("DJANGO_PASSWORD_ARGON2_TIME_COST", "2"))
+PASSWORD_ARGON2_MEMORY_COST = int(
+    os.getenv("DJANGO_PASSWORD_ARGON2_MEMORY_COST", "19456")
+)
+PASSWORD_ARGON2_PARALLELISM = int(
+    os.getenv("DJANGO_PASSWORD_ARGON2_PARALLELISM", "1")
+)
+PASSWORD_SCRYPT_WORK_FACTOR = int(
+    os.getenv("DJANGO_PASSWORD_SCRYPT_WORK_FACTOR", str(2**14))
+)
+PASSWORD_SCRYPT_BLOCK_SIZE = int(os.getenv("DJANGO_PASSWORD_SCRYPT_BLOCK_SIZE", "8"))
+PASSWORD_SCRYPT_PARALLELISM = int(os.getenv("DJANGO_PASSWORD_SCRYPT_PARALLELISM", "1"))
+PASSWORD_PBKDF2_ITERATIONS = int(
+    os.getenv("DJANGO_PASSWORD_PBKDF2_ITERATIONS", "1000000")
+)
+
 
 # Internationalization
 # https://docs.djangoproject.com/en/5.2/topics/i18n/
@@ -124,9 +170,19 @@ AUTH_USER_MODEL = "users.User"
 
 REST_FRAMEWORK = {
     "DEFAULT_AUTHENTICATION_CLASSES": (
-        "rest_framework_simplejwt.authentication.JWTAuthentication",
+        # `request.user` is built from the token claims, no database query
+        "users.authentication.StatelessJWTAuthentication",
     ),
     "DEFAULT_PERMISSION_CLASSES": ("rest_framework.permissions.IsAuthenticated",),
+    # the public endpoints that send mails (see `users.throttling`)
+    "DEFAULT_THROTTLE_RATES": {
+        "activation_resend": os.getenv(
+            "DJANGO_ACTIVATION_RESEND_RATE", default="10/hour"
+        ),
+        "activation_resend_email": os.getenv(
+            "DJANGO_ACTIVATION_RESEND_EMAIL_RATE", default="3/hour"
+        ),
+    },
     # 'DEFAULT_FILTER_BACKENDS': ['django_filters.rest_framework.DjangoFilterBackend']
     # 'DEFAULT_PAGINATION_CLASS': 'rest_framework.pagination.PageNumberPagination',
     # 'PAGE_SIZE': 1
@@ -142,25 +198,63 @@ REST_FRAMEWORK = {
 # server -> updated access token + refresh token
 
 SIMPLE_JWT = {
-    "ACCESS_TOKEN_LIFETIME": timedelta(minutes=120),
+    # the role & is_active claims are trusted until the token expires,
+    # a changed user gets them on the next refresh
+    "ACCESS_TOKEN_LIFETIME": timedelta(
+        minutes=int(os.getenv("DJANGO_ACCESS_TOKEN_MINUTES", default="10"))
+    ),
     "REFRESH_TOKEN_LIFETIME": timedelta(days=1),
     "UPDATE_LAST_LOGIN": True,
     "ALGORITHM": "HS256",
     "SIGNING_KEY": SECRET_KEY,
     "AUTH_HEADER_TYPES": ("Bearer",),
+    "TOKEN_OBTAIN_SERIALIZER": "users.authentication.TokenObtainPairSerializer",
+    "TOKEN_REFRESH_SERIALIZER": "users.authentication.TokenRefreshSerializer",
+    "TOKEN_USER_CLASS": "users.authentication.TokenUser",
 }
 
 
+CACHE_URL = os.getenv("DJANGO_CACHE_URL", default="redis://cache:6379/0")
+# the tests never touch the working keys (see `config.test_runner`)
+TEST_CACHE_URL = os.getenv("DJANGO_TEST_CACHE_URL", default="redis://cache:6379/15")
+# json, orjson or msgpack (orjson by default, json if it isn't installed)
+CACHE_CODEC = os.getenv(
+    "DJANGO_CACHE_CODEC",
+    default="orjson" if importlib.util.find_spec("orjson") is not None else "json",
+)
+# compress (zstd) values larger than this number of bytes, empty - never
+CACHE_COMPRESSION_THRESHOLD = (
+    int(os.environ["DJANGO_CACHE_COMPRESSION_THRESHOLD"])
+    if os.getenv("DJANGO_CACHE_COMPRESSION_THRESHOLD")
+    else None
+)
+# in-process cache in front of Redis (see `shared.cache.TieredCacheService`)
+LOCAL_CACHE_MAX_SIZE = int(os.getenv("DJANGO_LOCAL_CACHE_MAX_SIZE", default="1024"))
+LOCAL_CACHE_TTL = int(os.getenv("DJANGO_LOCAL_CACHE_TTL", default="60"))
+# seconds the user records are cached in the process, 0 - never
+USER_CACHE_TTL = int(os.getenv("DJANGO_USER_CACHE_TTL", default="30"))
 CACHES = {
     "default": {
         "BACKEND": "django.core.cache.backends.redis.RedisCache",
-        "LOCATION": os.getenv("DJANGO_CACHE_URL", default="redis://cache:6379/0"),
+        "LOCATION": CACHE_URL,
     }
 }
 
+TEST_RUNNER = "config.test_runner.TestRunner"
+
 
 EMAIL_BACKEND = "django.core.mail.backends.smtp.EmailBackend"
 EMAIL_HOST = os.getenv("DJANGO_EMAIL_HOST", default="mailing")
 EMAIL_PORT = int(os.getenv("DJANGO_EMAIL_PORT", default="1025"))
 # EMAIL_HOST_USER = "mailpit"
 # EMAIL_HOST_PASSWORD = "mailpit"
+
+
+# Restaurants & delivery providers
+SILPO_API_URL = os.getenv("SILPO_API_URL", default="http://localhost:8001/api")
+KFC_API_URL = os.getenv("KFC_API_URL", default="http://localhost:8002/api")
+UKLON_API_URL = os.getenv("UKLON_API_URL", default="http://localhost:8003")
+# the webhooks are signed with HMAC-SHA256 of the body, in `X-Signature`
+WEBHOOK_SECRETS = {
+    "kfc": os.getenv("KFC_WEBHOOK_SECRET", default=""),
+}
@@ -0,0 +1,23 @@
+from django.conf import settings
+from django.test.runner import DiscoverRunner
+from django.test.utils import override_settings
+
+
+class TestRunner(DiscoverRunner):
+    """The tests use `TEST_CACHE_URL`, the working Redis keys are never touched."""
+
+    def setup_test_environment(self, **kwargs):
+        super().setup_test_environment(**kwargs)
+
+        self.cache_settings = override_settings(
+            CACHE_URL=settings.TEST_CACHE_URL,
+            CACHES={
+                name: cache | {"LOCATION": settings.TEST_CACHE_URL}
+                for name, cache in settings.CACHES.items()
+            },
+        )
+        self.cache_settings.enable()
+
+    def teardown_test_environment(self, **kwargs):
+        self.cache_settings.disable()
+        super().teardown_test_environment(**kwargs)
@@ -2,16 +2,25 @@ from django.contrib import admin
 from django.urls import path, include
 from rest_framework_simplejwt.views import (
     TokenObtainPairView,
+    TokenRefreshView,
 )
 from users.views import router as users_router
 from food.views import router as food_router
-from food.views import import_dishes
+from food.views import dishes, import_dishes, order_events, orders, retrieve_order
+from food.webhooks import provider_webhook
 
 
 urlpatterns = [
     path("admin/food/dish/import-dishes/", import_dishes, name="import_dishes"),
     path("admin/", admin.site.urls),
     path('auth/token/', TokenObtainPairView.as_view(), name='obtain_token'),
+    path("auth/token/refresh/", TokenRefreshView.as_view(), name="refresh_token"),
     path("users/", include(users_router.urls)),
+    # async views, the rest of `food/` is served by the DRF router
+    path("food/dishes/", dishes, name="dishes"),
+    path("food/orders/", orders, name="orders"),
+    path("food/orders/<int:id>/", retrieve_order, name="retrieve_order"),
+    path("food/orders/<int:id>/events", order_events, name="order_events"),
     path("food/", include(food_router.urls)),
+    path("webhooks/<str:provider>", provider_webhook, name="provider_webhook"),
 ]
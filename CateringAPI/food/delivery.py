@@ -0,0 +1,64 @@
+"""
+Courier locations of the orders in delivery.
+
+Only the latest location is kept, in a separate short-lived key (the
+tracking order lives for a day, a location is stale in a minute):
+
+    orders:17:location  "[50.45, 30.52]"   // expires in LOCATION_TTL
+
+and every change is published to the order events channel, so the
+clients streaming `GET /food/orders/17/events` see the courier moving:
+
+    orders:17:events  {"type": "location", "location": [50.45, 30.52]}
+
+Saving is a single Redis round trip and locations never touch the database.
+"""
+
+import json
+
+from shared.cache import CacheService
+
+from .events import location_key, order_channel
+
+# seconds the location is kept after the last update
+LOCATION_TTL = 60
+
+# KEYS[1] - location, KEYS[2] - order events channel
+# ARGV[1] - new location, ARGV[2] - TTL, ARGV[3] - the event
+# returns: 0 the same location (TTL refreshed), 1 changed & published
+SAVE_LOCATION_SCRIPT = """
+local previous = redis.call('GET', KEYS[1])
+redis.call('SET', KEYS[1], ARGV[1], 'EX', ARGV[2])
+if previous == ARGV[1] then
+    return 0
+end
+redis.call('PUBLISH', KEYS[2], ARGV[3])
+return 1
+"""
+
+
+def save_location(order_id: int, location: list[float]) -> bool:
+    """Save the courier location, returns `True` if it has changed."""
+
+    connection = CacheService().connection
+    script = connection.register_script(SAVE_LOCATION_SCRIPT)
+    location = [float(value) for value in location]
+
+    return bool(
+        script(
+            keys=[location_key(order_id), order_channel(order_id)],
+            args=[
+                json.dumps(location),
+                LOCATION_TTL,
+                json.dumps({"type": "location", "location": location}),
+            ],
+        )
+    )
+
+
+def get_location(order_id: int) -> list[float] | None:
+    raw: bytes | None = CacheService().connection.get(  # type: ignore
+        location_key(order_id)
+    )
+
+    return json.loads(raw) if raw is not None else None
@@ -0,0 +1,102 @@
+"""
+Order status events, delivered to clients with Server-Sent Events.
+
+The dispatch code publishes every change to the order's Redis channel:
+
+    orders:17:events  {"type": "restaurant", "restaurant_id": 1, "status": "cooked"}
+    orders:17:events  {"type": "order", "status": "cooked"}
+    orders:17:events  {"type": "location", "location": [50.45, 30.52]}
+
+and `GET /food/orders/17/events` streams them to the client over one
+long-lived connection instead of polling `GET /food/orders/17`:
+
+    event: order
+    data: {"type": "order", "status": "cooked"}
+
+Streams need the ASGI server (`config/asgi.py`): every open stream is an
+idle coroutine there, but a whole worker thread under WSGI.
+"""
+
+import asyncio
+import json
+from typing import AsyncIterator, Awaitable, Callable
+
+from shared.cache import CacheService, get_async_connection
+
+from .enums import OrderStatus
+
+# seconds between keep-alive comments, proxies drop silent connections
+KEEPALIVE_INTERVAL = 15
+
+# the order can't change anymore, the stream is closed
+FINAL_STATUSES = {
+    OrderStatus.DELIVERED,
+    OrderStatus.NOT_DELIVERED,
+    OrderStatus.CANCELLED_BY_CUSTOMER,
+    OrderStatus.CANCELLED_BY_MANAGER,
+    OrderStatus.CANCELLED_BY_ADMIN,
+    OrderStatus.CANCELLED_BY_RESTAURANT,
+    OrderStatus.CANCELLED_BY_DRIVER,
+    OrderStatus.FAILED,
+}
+
+
+def order_channel(order_id: int) -> str:
+    return CacheService._build_key("orders", f"{order_id}:events")
+
+
+def location_key(order_id: int) -> str:
+    """The latest courier location, see `food.delivery`."""
+
+    return CacheService._build_key("orders", f"{order_id}:location")
+
+
+def publish_order_event(order_id: int, event: dict) -> None:
+    CacheService().connection.publish(order_channel(order_id), json.dumps(event))
+
+
+def format_event(event: dict) -> bytes:
+    return f"event: {event['type']}\ndata: {json.dumps(event)}\n\n".encode()
+
+
+async def stream_order_events(
+    order_id: int, current_status: Callable[[], Awaitable[str | None]]
+) -> AsyncIterator[bytes]:
+    """SSE messages of the order until it reaches the final status.
+
+    The channel is subscribed before the current status is read, so no
+    change between them is lost.
+    """
+
+    # the shared client, only the subscription holds its own connection
+    client = get_async_connection()
+    pubsub = client.pubsub()
+
+    try:
+        await pubsub.subscribe(order_channel(order_id))
+
+        status = await current_status()
+        yield format_event({"type": "order", "status": status})
+        if status in FINAL_STATUSES:
+            return
+
+        # the courier could stand still, the client gets the location at once
+        if (location := await client.get(location_key(order_id))) is not None:
+            yield format_event({"type": "location", "location": json.loads(location)})
+
+        while True:
+            message = await pubsub.get_message(
+                ignore_subscribe_messages=True, timeout=KEEPALIVE_INTERVAL
+            )
+            if message is None:
+                yield b": keep-alive\n\n"
+                continue
+
+            event: dict = json.loads(message["data"])
+            yield format_event(event)
+
+            if event["type"] == "order" and event["status"] in FINAL_STATUSES:
+                return
+    finally:
+        # the client disconnected or the order is finished
+        await asyncio.shield(pubsub.aclose())
@@ -0,0 +1,156 @@
+"""
+Streaming export of the menu and orders.
+
+Rows are read with a server-side cursor (`.iterator(chunk_size=...)`)
+and encoded on the fly, so an export of any size runs in constant
+memory and the first bytes are sent right away:
+
+    response = StreamingHttpResponse(export_dishes(EXPORT_CSV), ...)
+
+The ASGI server consumes a sync iterator with `sync_to_async(list)`, i.e.
+the whole export in memory, so there it is wrapped with `aiterate()`.
+
+Formats:
+    csv     a header and one line per row (per order item for orders)
+    ndjson  one JSON object per line (per order, with its items)
+"""
+
+import csv
+import io
+import itertools
+import json
+from datetime import date
+from typing import AsyncIterator, Iterable, Iterator
+
+from asgiref.sync import sync_to_async
+from django.core.serializers.json import DjangoJSONEncoder
+
+from .models import Dish, Order, Restaurant
+
+EXPORT_CSV = "csv"
+EXPORT_NDJSON = "ndjson"
+
+EXPORT_CONTENT_TYPES = {
+    EXPORT_CSV: "text/csv",
+    EXPORT_NDJSON: "application/x-ndjson",
+}
+
+# rows fetched from the database at once
+EXPORT_CHUNK_SIZE = 2000
+# bytes sent to the client at once, instead of a tiny chunk per row
+EXPORT_BUFFER_SIZE = 64 * 1024
+
+
+async def aiterate(chunks: Iterator[bytes]) -> AsyncIterator[bytes]:
+    """The export for the ASGI server, one buffer at a time.
+
+    Every buffer is built in the thread of the request (`thread_sensitive`),
+    so the server-side cursor stays on the same database connection.
+    """
+
+    while (chunk := await sync_to_async(next)(chunks, None)) is not None:
+        yield chunk
+
+
+def _buffered(lines: Iterable[str]) -> Iterator[bytes]:
+    buffer = io.StringIO()
+
+    for line in lines:
+        buffer.write(line)
+        if buffer.tell() >= EXPORT_BUFFER_SIZE:
+            yield buffer.getvalue().encode()
+            buffer.seek(0)
+            buffer.truncate()
+
+    if buffer.tell():
+        yield buffer.getvalue().encode()
+
+
+def _csv_lines(header: list[str], rows: Iterable[tuple]) -> Iterator[str]:
+    line = io.StringIO()
+    writer = csv.writer(line)
+
+    for row in itertools.chain([header], rows):
+        writer.writerow(row)
+        yield line.getvalue()
+        line.seek(0)
+        line.truncate()
+
+
+def _ndjson_lines(objects: Iterable[dict]) -> Iterator[str]:
+    for obj in objects:
+        yield json.dumps(obj, cls=DjangoJSONEncoder) + "\n"
+
+
+def _export(fields: list[str], rows: Iterable[tuple], output: str) -> Iterator[bytes]:
+    if output == EXPORT_CSV:
+        return _buffered(_csv_lines(fields, rows))
+    else:
+        return _buffered(_ndjson_lines(dict(zip(fields, row)) for row in rows))
+
+
+def export_restaurants(output: str) -> Iterator[bytes]:
+    fields = ["id", "name", "address"]
+    rows = (
+        Restaurant.objects.order_by("id")
+        .values_list(*fields)
+        .iterator(chunk_size=EXPORT_CHUNK_SIZE)
+    )
+
+    return _export(fields, rows, output)
+
+
+def export_dishes(output: str) -> Iterator[bytes]:
+    fields = ["id", "name", "price", "restaurant_id", "restaurant"]
+    rows = (
+        Dish.objects.order_by("id")
+        .values_list("id", "name", "price", "restaurant_id", "restaurant__name")
+        .iterator(chunk_size=EXPORT_CHUNK_SIZE)
+    )
+
+    return _export(fields, rows, output)
+
+
+ORDER_FIELDS = ["id", "eta", "status", "delivery_provider", "total", "user_id"]
+ORDER_ITEM_FIELDS = ["dish_id", "quantity"]
+
+
+def export_orders(
+    output: str, eta_from: date | None = None, eta_to: date | None = None
+) -> Iterator[bytes]:
+    """Orders with the ETA in the range (inclusive).
+
+    Orders and their items are read with one LEFT JOIN query sorted by
+    the order, so every order is complete once the next one starts.
+    """
+
+    orders = Order.objects.all()
+    if eta_from is not None:
+        orders = orders.filter(eta__gte=eta_from)
+    if eta_to is not None:
+        orders = orders.filter(eta__lte=eta_to)
+
+    rows = (
+        orders.order_by("id", "items__id")
+        .values_list(*ORDER_FIELDS, "items__dish_id", "items__quantity")
+        .iterator(chunk_size=EXPORT_CHUNK_SIZE)
+    )
+
+    if output == EXPORT_CSV:
+        return _buffered(_csv_lines([*ORDER_FIELDS, *ORDER_ITEM_FIELDS], rows))
+
+    size = len(ORDER_FIELDS)
+    objects = (
+        {
+            **dict(zip(ORDER_FIELDS, order)),
+            "items": [
+                dict(zip(ORDER_ITEM_FIELDS, row[size:]))
+                for row in order_rows
+                # an order without items has one row of NULLs
+                if row[size] is not None
+            ],
+        }
+        for order, order_rows in itertools.groupby(rows, key=lambda row: row[:size])
+    )
+
+    return _buffered(_ndjson_lines(objects))
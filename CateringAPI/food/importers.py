@@ -0,0 +1,132 @@
+"""
+Streaming import of the dishes catalogue from CSV:
+
+    name,price,restaurant
+    Big Mac,120,McDonalds
+    Twister,150,KFC
+
+The file is decoded row by row (never read into memory as a whole),
+restaurants are resolved from an in-memory name index built with one
+query, and dishes are inserted in batches with `bulk_create`.
+
+    with open("catalogue.csv", "rb") as file:
+        report = import_dishes(file)
+"""
+
+import csv
+import io
+from dataclasses import dataclass, field
+from typing import BinaryIO
+
+from django.db import transaction
+
+from .menu import invalidate_menu_snapshot
+from .models import Dish, Restaurant
+
+IMPORT_COLUMNS = {"name", "price", "restaurant"}
+IMPORT_BATCH_SIZE = 1000
+
+# only the first errors are kept, the rest are counted
+MAX_REPORTED_ERRORS = 100
+
+
+@dataclass
+class ImportReport:
+    created: int = 0
+    failed: int = 0
+    # (line number, message)
+    errors: list[tuple[int, str]] = field(default_factory=list)
+
+    def error(self, line: int, message: str) -> None:
+        self.failed += 1
+        if len(self.errors) < MAX_REPORTED_ERRORS:
+            self.errors.append((line, message))
+
+
+class RestaurantIndex:
+    """Restaurant IDs by name, every name is resolved only once.
+
+    Exact (case insensitive) names are matched first, otherwise the
+    restaurant that contains the name, like `name__icontains` did.
+    """
+
+    def __init__(self):
+        self.ids: dict[str, int] = {
+            name.lower(): pk
+            for pk, name in Restaurant.objects.values_list("id", "name")
+        }
+        self.resolved: dict[str, int | None] = {}
+
+    def get(self, name: str) -> int | None:
+        name = name.strip().lower()
+
+        if name not in self.resolved:
+            restaurant_id = self.ids.get(name)
+            if restaurant_id is None and name:
+                restaurant_id = next(
+                    (pk for known, pk in self.ids.items() if name in known), None
+                )
+            self.resolved[name] = restaurant_id
+
+        return self.resolved[name]
+
+
+def import_dishes(file: BinaryIO, batch_size: int = IMPORT_BATCH_SIZE) -> ImportReport:
+    """Import dishes from the binary CSV stream, bad rows are skipped."""
+
+    report = ImportReport()
+    restaurants = RestaurantIndex()
+    batch: list[Dish] = []
+
+    def flush():
+        Dish.objects.bulk_create(batch, batch_size=batch_size)
+        report.created += len(batch)
+        batch.clear()
+
+    # `utf-8-sig` drops the BOM added by spreadsheet editors
+    stream = io.TextIOWrapper(file, encoding="utf-8-sig", newline="")
+    reader = csv.DictReader(stream)
+
+    try:
+        if missing := IMPORT_COLUMNS - set(reader.fieldnames or ()):
+            report.error(1, f"Columns {', '.join(sorted(missing))} are missing")
+            return report
+
+        for row in reader:
+            line = reader.line_num
+            # short rows have `None` values
+            name = (row["name"] or "").strip()
+            restaurant_name = row["restaurant"] or ""
+
+            try:
+                price = int(row["price"] or "")
+            except ValueError:
+                report.error(line, f"Invalid price {row['price']!r}")
+                continue
+
+            if not name:
+                report.error(line, "Dish name is empty")
+                continue
+
+            restaurant_id = restaurants.get(restaurant_name)
+            if restaurant_id is None:
+                report.error(line, f"Restaurant {restaurant_name} is not found")
+                continue
+
+            batch.append(Dish(name=name, price=price, restaurant_id=restaurant_id))
+            if len(batch) >= batch_size:
+                flush()
+
+        if batch:
+            flush()
+    except UnicodeDecodeError as error:
+        report.error(reader.line_num + 1, f"File is not UTF-8: {error.reason}")
+    finally:
+        # the file belongs to the caller
+        stream.detach()
+
+    # `bulk_create` sends no signals, the menu is invalidated once
+    if report.created:
+        transaction.on_commit(invalidate_menu_snapshot)
+
+    return report
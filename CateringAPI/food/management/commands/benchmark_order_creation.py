@@ -0,0 +1,90 @@
+import time
+from datetime import date, timedelta
+
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.test.utils import CaptureQueriesContext
+
+from users.models import User
+
+from food.models import Dish, Restaurant
+from food.services import create_order
+from food.views import OrderSerializer
+
+
+class Rollback(Exception):
+    pass
+
+
+class Command(BaseCommand):
+    help = "Measure the order creation latency depending on the items count"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--items",
+            type=int,
+            nargs="+",
+            default=[1, 10, 100, 500, 1000],
+            help="Items count of the measured orders",
+        )
+        parser.add_argument(
+            "--repeat",
+            type=int,
+            default=5,
+            help="How many times every order is created, the best time is shown",
+        )
+
+    def handle(self, *args, **options):
+        # everything is created inside the transaction that is rolled back
+        try:
+            with transaction.atomic():
+                self.benchmark(options["items"], options["repeat"])
+                raise Rollback
+        except Rollback:
+            pass
+
+    def benchmark(self, counts: list[int], repeat: int):
+        user = User.objects.create(
+            email="benchmark@catering.com",
+            phone_number="0000000000",
+            first_name="Benchmark",
+            last_name="Benchmark",
+        )
+        restaurant = Restaurant.objects.create(name="Benchmark", address="-")
+        dishes = Dish.objects.bulk_create(
+            [
+                Dish(name=f"Dish {i}", price=i + 1, restaurant=restaurant)
+                for i in range(max(counts))
+            ]
+        )
+
+        self.stdout.write(f"{'items':>8} {'best, ms':>10} {'per item, ms':>14} {'queries':>8}")
+
+        for count in counts:
+            payload = {
+                "eta": str(date.today() + timedelta(days=2)),
+                "delivery_provider": "uklon",
+                "items": [{"dish": dish.pk, "quantity": 1} for dish in dishes[:count]],
+            }
+
+            timings: list[float] = []
+            for _ in range(repeat):
+                with CaptureQueriesContext(connection) as queries:
+                    started_at = time.perf_counter()
+
+                    serializer = OrderSerializer(data=payload)
+                    serializer.is_valid(raise_exception=True)
+                    create_order(
+                        user_id=user.pk,
+                        eta=serializer.validated_data["eta"],
+                        items=serializer.validated_data["items"],
+                        total=serializer.calculated_total,
+                        delivery_provider=serializer.validated_data["delivery_provider"],
+                    )
+
+                    timings.append((time.perf_counter() - started_at) * 1000)
+
+            best = min(timings)
+            self.stdout.write(
+                f"{count:>8} {best:>10.2f} {best / count:>14.4f} {len(queries):>8}"
+            )
@@ -0,0 +1,160 @@
+import asyncio
+import socket
+from typing import Awaitable, Callable
+
+from asgiref.sync import sync_to_async
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+
+from shared.queue import Message, QueueService
+
+from food.services import (
+    DELIVERIES_QUEUE,
+    ORDER_MAX_ATTEMPTS,
+    ORDERS_QUEUE,
+    close_provider_clients,
+    fail_order,
+    process_delivery,
+    process_order,
+    retry_order,
+)
+
+# queue -> the order processing stage
+HANDLERS = {
+    ORDERS_QUEUE: process_order,
+    DELIVERIES_QUEUE: process_delivery,
+}
+
+
+class Command(BaseCommand):
+    help = "Process scheduled food orders from the orders (or deliveries) queue"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--queue",
+            choices=HANDLERS,
+            default=ORDERS_QUEUE,
+            help="Cooking in restaurants (orders) or delivery (deliveries)",
+        )
+        parser.add_argument(
+            "--concurrency",
+            type=int,
+            default=10,
+            help="How many orders are processed at the same time",
+        )
+        parser.add_argument(
+            "--consumer",
+            default=socket.gethostname(),
+            help="Unique worker name, used to recover unacknowledged orders",
+        )
+        parser.add_argument(
+            "--retry-delay",
+            type=float,
+            default=5,
+            help="Seconds before the failed order is retried, grows every attempt",
+        )
+
+    def handle(self, *args, **options):
+        self.retry_delay: float = options["retry_delay"]
+        asyncio.run(
+            self.serve(options["queue"], options["consumer"], options["concurrency"])
+        )
+
+    async def serve(self, name: str, consumer: str, concurrency: int):
+        queue = QueueService()
+
+        recovered = queue.recover(name=name, consumer=consumer)
+        if recovered:
+            self.stdout.write(f"{recovered} unfinished orders returned to the queue")
+
+        self.stdout.write(f"Dispatcher {consumer} is waiting for {name}...")
+
+        # take new orders from the queue only when there is a free slot
+        slots = asyncio.Semaphore(concurrency)
+        tasks: set[asyncio.Task] = set()
+
+        try:
+            while True:
+                await slots.acquire()
+                message = await asyncio.to_thread(
+                    queue.pop, name=name, consumer=consumer
+                )
+                if message is None:
+                    slots.release()
+                else:
+                    task = asyncio.create_task(
+                        self.process(HANDLERS[name], queue, message, slots)
+                    )
+                    # keep the reference until the task is done
+                    tasks.add(task)
+                    task.add_done_callback(tasks.discard)
+        finally:
+            # stopped, the unfinished orders are recovered on the next start
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+            await close_provider_clients()
+
+    async def process(
+        self,
+        handler: Callable[[int], Awaitable[None]],
+        queue: QueueService,
+        message: Message,
+        slots: asyncio.Semaphore,
+    ):
+        order_id: int = message.value["order_id"]
+        self.stdout.write(f"Processing order {order_id}")
+
+        failure: Exception | None = None
+
+        try:
+            # the worker never stops, so the dropped database connections
+            # are replaced around every order, like Django does per request
+            await sync_to_async(close_old_connections)()
+            await handler(order_id)
+        except Exception as error:
+            self.stderr.write(f"Order {order_id} processing failed: {error}")
+            failure = error
+        else:
+            self.stdout.write(f"Order {order_id} is processed")
+            # a crash before this line returns the message with `recover()`
+            await asyncio.to_thread(queue.ack, message)
+        finally:
+            await sync_to_async(close_old_connections)()
+            slots.release()
+
+        # the slot is free while waiting, a provider outage does not stop
+        # the other orders from being dispatched
+        if failure is not None:
+            await self.retry(queue, message, failure)
+
+    async def retry(self, queue: QueueService, message: Message, error: Exception):
+        """Push the order back to the queue after the delay (or to dead letters).
+
+        The message is acknowledged once it is pushed back. If the push
+        fails, it stays unacknowledged and `recover()` returns it.
+        """
+
+        value: dict = message.value
+        order_id: int = value["order_id"]
+        # the provider might be down for a moment, do not hammer it
+        await asyncio.sleep(self.retry_delay * (value.get("attempts", 0) + 1))
+
+        try:
+            alive = await sync_to_async(retry_order)(message.queue, value, error, queue)
+        except Exception as retry_error:
+            self.stderr.write(f"Order {order_id} retry failed: {retry_error}")
+            return
+
+        try:
+            if not alive:
+                self.stderr.write(
+                    f"Order {order_id} failed {ORDER_MAX_ATTEMPTS} times, "
+                    f"moved to {message.queue}:dead"
+                )
+                await sync_to_async(fail_order)(order_id)
+        except Exception as fail_error:
+            self.stderr.write(f"Order {order_id} is not marked failed: {fail_error}")
+        finally:
+            # pushed back, a duplicate must not be recovered
+            await asyncio.to_thread(queue.ack, message)
@@ -0,0 +1,34 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from food.importers import IMPORT_BATCH_SIZE, import_dishes
+
+
+class Command(BaseCommand):
+    help = "Import dishes from the CSV file (name,price,restaurant)"
+
+    def add_arguments(self, parser):
+        parser.add_argument("path", help="Path to the CSV file")
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=IMPORT_BATCH_SIZE,
+            help="How many dishes are inserted with one query",
+        )
+
+    def handle(self, *args, **options):
+        try:
+            file = open(options["path"], "rb")
+        except OSError as error:
+            raise CommandError(str(error))
+
+        with file:
+            report = import_dishes(file, batch_size=options["batch_size"])
+
+        for line, error in report.errors:
+            self.stderr.write(f"Line {line}: {error}")
+        if report.failed > len(report.errors):
+            self.stderr.write(f"... and {report.failed - len(report.errors)} more")
+
+        self.stdout.write(
+            f"{report.created} dishes imported, {report.failed} rows failed"
+        )
@@ -1,21 +1,31 @@
 """
-RESTAURANT: {
+RESTAURANT (DELIVERY PROVIDER): {
     EXTERNAL STATUS: INTERNAL STATUS
 }
 """
 
 from .enums import OrderStatus
-from .providers import silpo, kfc
+from .providers import silpo, kfc, uklon
 
 RESTAURANT_EXTERNAL_TO_INTERNAL: dict[str, dict[str, OrderStatus]] = {
     "silpo": {
         silpo.OrderStatus.NOT_STARTED: OrderStatus.NOT_STARTED,
         silpo.OrderStatus.COOKING: OrderStatus.COOKING,
         silpo.OrderStatus.COOKED: OrderStatus.COOKED,
+        silpo.OrderStatus.FINISHED: OrderStatus.COOKED,
     },
     "kfc": {
-        # kfc.OrderStatus.NOT_STARTED: OrderStatus.NOT_STARTED,
-        # kfc.OrderStatus.COOKING: OrderStatus.COOKING,
-        # kfc.OrderStatus.COOKED: OrderStatus.COOKED,
+        kfc.OrderStatus.NOT_STARTED: OrderStatus.NOT_STARTED,
+        kfc.OrderStatus.COOKING: OrderStatus.COOKING,
+        kfc.OrderStatus.COOKED: OrderStatus.COOKED,
+        kfc.OrderStatus.FINISHED: OrderStatus.COOKED,
+    },
+}
+
+DELIVERY_EXTERNAL_TO_INTERNAL: dict[str, dict[str, OrderStatus]] = {
+    "uklon": {
+        uklon.OrderStatus.NOT_STARTED: OrderStatus.DELIVERY_LOOKUP,
+        uklon.OrderStatus.DELIVERY: OrderStatus.DELIVERY,
+        uklon.OrderStatus.DELIVERED: OrderStatus.DELIVERED,
     },
 }
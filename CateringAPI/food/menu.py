@@ -0,0 +1,104 @@
+"""
+Materialized menu for `GET /food/dishes`.
+
+The menu is serialized once and stored in Redis as ready-to-send JSON
+bytes with its version:
+
+    menu:snapshot {
+        version: "3f1c0a9d27b4e6a1",  // hash of the content, used as ETag
+        generation: "17",             // `menu:generation` it was built for
+        content: b'[{"id": 1, "dishes": [...], ...}]',
+    }
+
+Every committed change of dishes or restaurants increments
+`menu:generation` (a single O(1) command, even for bulk imports), and
+the outdated snapshot is rebuilt on the next read.
+"""
+
+import hashlib
+from dataclasses import dataclass
+
+from asgiref.sync import sync_to_async
+from rest_framework.renderers import JSONRenderer
+
+from shared.cache import CacheService, get_async_connection
+
+from .models import Restaurant
+
+MENU_SNAPSHOT_KEY = CacheService._build_key("menu", "snapshot")
+MENU_GENERATION_KEY = CacheService._build_key("menu", "generation")
+
+
+@dataclass
+class MenuSnapshot:
+    version: str
+    content: bytes
+
+    @property
+    def etag(self) -> str:
+        return f'"{self.version}"'
+
+
+def invalidate_menu_snapshot() -> None:
+    CacheService().connection.incr(MENU_GENERATION_KEY)
+
+
+def build_menu_snapshot(generation: int = 0) -> MenuSnapshot:
+    """Serialize the whole menu and save it to the cache."""
+
+    # the serializer lives in views, which import this module
+    from .views import RestaurantSerializer
+
+    restaurants = Restaurant.objects.prefetch_related("dishes")
+    content: bytes = JSONRenderer().render(
+        RestaurantSerializer(restaurants, many=True).data
+    )
+    snapshot = MenuSnapshot(
+        version=hashlib.sha256(content).hexdigest()[:16], content=content
+    )
+
+    CacheService().connection.hset(
+        MENU_SNAPSHOT_KEY,
+        mapping={
+            "version": snapshot.version,
+            "generation": generation,
+            "content": snapshot.content,
+        },
+    )
+
+    return snapshot
+
+
+def get_menu_snapshot() -> MenuSnapshot:
+    with CacheService().connection.pipeline(transaction=False) as pipe:
+        pipe.get(MENU_GENERATION_KEY)
+        pipe.hgetall(MENU_SNAPSHOT_KEY)
+        raw_generation, payload = pipe.execute()
+
+    generation = int(raw_generation or 0)
+
+    # the menu has changed (or was never built) since the snapshot
+    if not payload or int(payload[b"generation"]) != generation:
+        return build_menu_snapshot(generation)
+
+    return MenuSnapshot(
+        version=payload[b"version"].decode(), content=payload[b"content"]
+    )
+
+
+async def aget_menu_snapshot() -> MenuSnapshot:
+    """`get_menu_snapshot()` for async views, only the rebuild takes a thread."""
+
+    async with get_async_connection().pipeline(transaction=False) as pipe:
+        pipe.get(MENU_GENERATION_KEY)
+        pipe.hgetall(MENU_SNAPSHOT_KEY)
+        raw_generation, payload = await pipe.execute()
+
+    generation = int(raw_generation or 0)
+
+    if not payload or int(payload[b"generation"]) != generation:
+        return await sync_to_async(build_menu_snapshot)(generation)
+
+    return MenuSnapshot(
+        version=payload[b"version"].decode(), content=payload[b"content"]
+    )
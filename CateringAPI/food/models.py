@@ -33,6 +33,13 @@ class Dish(models.Model):
 class Order(models.Model):
     class Meta:
         db_table = "orders"
+        # admin listing: keyset pagination by `id` with optional filters
+        indexes = [
+            models.Index(fields=["status", "id"], name="orders_status_id_idx"),
+            models.Index(
+                fields=["delivery_provider", "id"], name="orders_provider_id_idx"
+            ),
+        ]
 
     status = models.CharField(
         max_length=50, choices=OrderStatus.choices(), default=OrderStatus.NOT_STARTED
@@ -45,12 +52,26 @@ class Order(models.Model):
     def __str__(self) -> str:
         return f"[{self.pk}] {self.status} for {self.user.email}"
 
-    def items_by_restaurant(self) -> dict["Restaurant", models.QuerySet["OrderItem"]]:
-        results = {}
+    def items_by_restaurant(
+        self, in_memory: bool = True
+    ) -> dict["Restaurant", list["OrderItem"] | models.QuerySet["OrderItem"]]:
+        """Group order items by restaurants.
+
+        in_memory=True  - items are fetched with one query and grouped in lists
+        in_memory=False - lazy querysets, every one is a separate query
+        """
+
+        results: dict = {}
 
         # get all items for this order, optimize the query
         qs = self.items.select_related("dish__restaurant")
 
+        if in_memory:
+            for item in qs:
+                results.setdefault(item.dish.restaurant, []).append(item)
+
+            return results
+
         # N+1
         restaurants = {item.dish.restaurant for item in qs}
 
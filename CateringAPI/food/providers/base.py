@@ -0,0 +1,104 @@
+"""
+Shared HTTP layer for restaurants & delivery providers.
+
+Every provider client keeps long-lived connection pools, so hundreds of
+orders that poll the provider reuse the same keep-alive connections
+instead of opening a new TCP connection for every request.
+
+    class Client(BaseClient):
+        BASE_URL = "http://localhost:8001/api"
+
+    Client.request("GET", "/orders/13")           # sync, shared `httpx.Client`
+    await Client.arequest("GET", "/orders/13")    # async, shared `httpx.AsyncClient`
+"""
+
+import asyncio
+import importlib.util
+import threading
+import weakref
+
+import httpx
+
+# HTTP/2 is used only if the `h2` package is installed (httpx[http2])
+HTTP2_AVAILABLE: bool = importlib.util.find_spec("h2") is not None
+
+
+class BaseClient:
+    BASE_URL: str = ""
+
+    # per-provider limits, override in the provider client if needed
+    LIMITS = httpx.Limits(
+        max_connections=100,
+        max_keepalive_connections=20,
+        keepalive_expiry=30,
+    )
+    TIMEOUT = httpx.Timeout(5.0, connect=2.0)
+
+    _lock = threading.Lock()
+    _client: httpx.Client | None = None
+    # `httpx.AsyncClient` is bound to the event loop it was used in
+    _async_clients: weakref.WeakKeyDictionary
+
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+
+        # every provider has its own pools
+        cls._client = None
+        cls._async_clients = weakref.WeakKeyDictionary()
+
+    @classmethod
+    def _client_options(cls) -> dict:
+        return {
+            "base_url": cls.BASE_URL,
+            "limits": cls.LIMITS,
+            "timeout": cls.TIMEOUT,
+            "http2": HTTP2_AVAILABLE,
+        }
+
+    @classmethod
+    def client(cls) -> httpx.Client:
+        if cls._client is None:
+            with cls._lock:
+                if cls._client is None:
+                    cls._client = httpx.Client(**cls._client_options())
+
+        return cls._client
+
+    @classmethod
+    def async_client(cls) -> httpx.AsyncClient:
+        loop = asyncio.get_running_loop()
+
+        client: httpx.AsyncClient | None = cls._async_clients.get(loop)
+        if client is None:
+            client = httpx.AsyncClient(**cls._client_options())
+            cls._async_clients[loop] = client
+
+        return client
+
+    @classmethod
+    def request(cls, method: str, url: str, **kwargs) -> httpx.Response:
+        response: httpx.Response = cls.client().request(method, url, **kwargs)
+        response.raise_for_status()
+        return response
+
+    @classmethod
+    async def arequest(cls, method: str, url: str, **kwargs) -> httpx.Response:
+        response: httpx.Response = await cls.async_client().request(
+            method, url, **kwargs
+        )
+        response.raise_for_status()
+        return response
+
+    @classmethod
+    def close(cls) -> None:
+        if cls._client is not None:
+            cls._client.close()
+            cls._client = None
+
+    @classmethod
+    async def aclose(cls) -> None:
+        """Close the async client of the running event loop."""
+
+        client = cls._async_clients.pop(asyncio.get_running_loop(), None)
+        if client is not None:
+            await client.aclose()
@@ -0,0 +1,65 @@
+import enum
+from dataclasses import dataclass, asdict
+
+from django.conf import settings
+
+from .base import BaseClient
+
+
+class OrderStatus(enum.StrEnum):
+    NOT_STARTED = "not started"
+    COOKING = "cooking"
+    COOKED = "cooked"
+    FINISHED = "finished"
+
+
+@dataclass
+class OrderItem:
+    dish: str
+    quantity: int
+
+
+@dataclass
+class OrderRequestBody:
+    order: list[OrderItem]
+
+
+@dataclass
+class OrderResponse:
+    id: str
+    status: OrderStatus
+
+
+class Client(BaseClient):
+    # the url of running service
+    BASE_URL = settings.KFC_API_URL
+
+    @staticmethod
+    def _build_order(order_id: str, payload: dict | str) -> OrderResponse:
+        # KFC returns the bare status string for `GET /orders/ID`
+        if isinstance(payload, str):
+            return OrderResponse(id=order_id, status=OrderStatus(payload))
+        elif "error" in payload:
+            raise ValueError(f"KFC order {order_id} error: {payload['error']}")
+        else:
+            return OrderResponse(**payload)
+
+    @classmethod
+    def create_order(cls, order: OrderRequestBody):
+        response = cls.request("POST", "/orders", json=asdict(order))
+        return OrderResponse(**response.json())
+
+    @classmethod
+    def get_order(cls, order_id: str):
+        response = cls.request("GET", f"/orders/{order_id}")
+        return cls._build_order(order_id, response.json())
+
+    @classmethod
+    async def acreate_order(cls, order: OrderRequestBody):
+        response = await cls.arequest("POST", "/orders", json=asdict(order))
+        return OrderResponse(**response.json())
+
+    @classmethod
+    async def aget_order(cls, order_id: str):
+        response = await cls.arequest("GET", f"/orders/{order_id}")
+        return cls._build_order(order_id, response.json())
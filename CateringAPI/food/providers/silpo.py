@@ -1,7 +1,9 @@
 import enum
 from dataclasses import dataclass, asdict
 
-import httpx
+from django.conf import settings
+
+from .base import BaseClient
 
 
 class OrderStatus(enum.StrEnum):
@@ -28,18 +30,26 @@ class OrderResponse:
     status: OrderStatus
 
 
-class Client:
+class Client(BaseClient):
     # the url of running service
-    BASE_URL = "http://localhost:8001/api/orders"
+    BASE_URL = settings.SILPO_API_URL
 
     @classmethod
     def create_order(cls, order: OrderRequestBody):
-        response: httpx.Response = httpx.post(cls.BASE_URL, json=asdict(order))
-        response.raise_for_status()
+        response = cls.request("POST", "/orders", json=asdict(order))
         return OrderResponse(**response.json())
 
     @classmethod
     def get_order(cls, order_id: str):
-        response: httpx.Response = httpx.get(f"{cls.BASE_URL}/{order_id}")
-        response.raise_for_status()
+        response = cls.request("GET", f"/orders/{order_id}")
+        return OrderResponse(**response.json())
+
+    @classmethod
+    async def acreate_order(cls, order: OrderRequestBody):
+        response = await cls.arequest("POST", "/orders", json=asdict(order))
+        return OrderResponse(**response.json())
+
+    @classmethod
+    async def aget_order(cls, order_id: str):
+        response = await cls.arequest("GET", f"/orders/{order_id}")
         return OrderResponse(**response.json())
@@ -0,0 +1,60 @@
+import enum
+from dataclasses import dataclass, asdict
+
+from django.conf import settings
+
+from .base import BaseClient
+
+
+class OrderStatus(enum.StrEnum):
+    NOT_STARTED = "not started"
+    DELIVERY = "delivery"
+    DELIVERED = "delivered"
+
+
+@dataclass
+class OrderRequestBody:
+    addresses: list[str]
+    comments: list[str]
+
+
+@dataclass
+class OrderResponse:
+    id: str
+    status: OrderStatus
+    addresses: list[str]
+    comments: list[str]
+    # the courier coordinates, (latitude, longitude)
+    location: tuple[float, float] | None = None
+
+
+class Client(BaseClient):
+    # the url of running service
+    BASE_URL = settings.UKLON_API_URL
+
+    @staticmethod
+    def _build_order(order_id: str, payload: dict) -> OrderResponse:
+        if "error" in payload:
+            raise ValueError(f"Uklon order {order_id} error: {payload['error']}")
+
+        return OrderResponse(**payload)
+
+    @classmethod
+    def create_order(cls, order: OrderRequestBody):
+        response = cls.request("POST", "/drivers/orders", json=asdict(order))
+        return OrderResponse(**response.json())
+
+    @classmethod
+    def get_order(cls, order_id: str):
+        response = cls.request("GET", f"/drivers/orders/{order_id}")
+        return cls._build_order(order_id, response.json())
+
+    @classmethod
+    async def acreate_order(cls, order: OrderRequestBody):
+        response = await cls.arequest("POST", "/drivers/orders", json=asdict(order))
+        return OrderResponse(**response.json())
+
+    @classmethod
+    async def aget_order(cls, order_id: str):
+        response = await cls.arequest("GET", f"/drivers/orders/{order_id}")
+        return cls._build_order(order_id, response.json())
@@ -0,0 +1,250 @@
+"""
+Central scheduler for provider status polling.
+
+Instead of every order polling its provider each second, all tracked
+orders live in one heap keyed by the next due time:
+
+    scheduler = PollScheduler(poll=get_status)
+    await scheduler.track(provider="silpo", external_id="...", ...)
+
+- due polls are taken from the heap and executed together (batch)
+- while the order is COOKING the interval grows exponentially
+- near the expected completion time the interval becomes short again
+- every provider has its own budget of requests per second, shared by all
+  the dispatcher processes in Redis:
+
+    polling:silpo:1760659200  "37"   // requests in this second, expires
+
+- the order is given up (`TrackingError`) when the provider cancels it,
+  fails `max_failures` polls in a row or doesn't cook it in `timeout`
+"""
+
+import asyncio
+import heapq
+import itertools
+import time
+from dataclasses import dataclass, field
+from typing import Awaitable, Callable
+
+from shared.cache import get_async_connection
+
+from .enums import OrderStatus
+
+
+@dataclass(order=True)
+class PollJob:
+    due: float
+    seq: int
+    provider: str = field(compare=False)
+    external_id: str = field(compare=False)
+    order_id: int = field(compare=False)
+    restaurant_id: int = field(compare=False)
+    started_at: float = field(compare=False)
+    interval: float = field(compare=False)
+    done: asyncio.Future = field(compare=False, repr=False)
+    # failed polls in a row
+    failures: int = field(default=0, compare=False)
+
+
+@dataclass
+class ProviderPolicy:
+    # requests per second the provider allows us to make, all processes together
+    rate_limit: int = 20
+    # how long the provider usually cooks, seconds
+    expected_time: float = 10
+    min_interval: float = 1
+    max_interval: float = 30
+    backoff: float = 2
+    # the order is given up after this many seconds or failed polls in a row
+    timeout: float = 60 * 60
+    max_failures: int = 10
+
+
+# the provider is still working on the order
+ACTIVE_STATUSES = {OrderStatus.NOT_STARTED, OrderStatus.COOKING}
+
+
+class TrackingError(Exception):
+    """The order won't be cooked, `status` is its final status."""
+
+    def __init__(self, message: str, status: OrderStatus):
+        super().__init__(message)
+        self.status = status
+
+
+# KEYS[1] - the provider's counter of the current second
+# ARGV[1] - wanted requests, ARGV[2] - the provider's rate limit
+# returns: how many requests can be made
+TAKE_BUDGET_SCRIPT = """
+local used = tonumber(redis.call('GET', KEYS[1]) or '0')
+local granted = math.min(tonumber(ARGV[1]), tonumber(ARGV[2]) - used)
+if granted <= 0 then
+    return 0
+end
+redis.call('INCRBY', KEYS[1], granted)
+redis.call('EXPIRE', KEYS[1], 2)
+return granted
+"""
+
+
+async def take_budget(provider: str, wanted: int, rate_limit: int) -> int:
+    """Requests to the provider allowed in the current second, up to `wanted`."""
+
+    window = int(time.time())
+    script = get_async_connection().register_script(TAKE_BUDGET_SCRIPT)
+
+    return int(
+        await script(keys=[f"polling:{provider}:{window}"], args=[wanted, rate_limit])
+    )
+
+
+class PollScheduler:
+    def __init__(
+        self,
+        poll: Callable[[PollJob], Awaitable[OrderStatus]],
+        policies: dict[str, ProviderPolicy] | None = None,
+    ):
+        self.poll = poll
+        self.policies: dict[str, ProviderPolicy] = policies or {}
+        self.heap: list[PollJob] = []
+        self.counter = itertools.count()
+        self.wakeup = asyncio.Event()
+        self.task: asyncio.Task | None = None
+        self.running: set[asyncio.Task] = set()
+
+    def policy(self, provider: str) -> ProviderPolicy:
+        return self.policies.setdefault(provider, ProviderPolicy())
+
+    def next_interval(self, job: PollJob, status: OrderStatus) -> float:
+        policy = self.policy(job.provider)
+
+        if status != OrderStatus.COOKING:
+            return policy.min_interval
+
+        interval = min(job.interval * policy.backoff, policy.max_interval)
+
+        # do not sleep through the expected completion time
+        remaining = job.started_at + policy.expected_time - time.monotonic()
+        if remaining > 0:
+            interval = min(interval, max(remaining, policy.min_interval))
+        else:
+            interval = min(interval, policy.min_interval * policy.backoff)
+
+        return interval
+
+    def push(self, job: PollJob) -> None:
+        heapq.heappush(self.heap, job)
+        self.wakeup.set()
+
+    async def track(
+        self, provider: str, external_id: str, order_id: int, restaurant_id: int
+    ) -> None:
+        """Wait until the provider's order is cooked."""
+
+        if self.task is None or self.task.done():
+            self.task = asyncio.create_task(self.run())
+
+        now = time.monotonic()
+        policy = self.policy(provider)
+        job = PollJob(
+            due=now + policy.min_interval,
+            seq=next(self.counter),
+            provider=provider,
+            external_id=external_id,
+            order_id=order_id,
+            restaurant_id=restaurant_id,
+            started_at=now,
+            interval=policy.min_interval,
+            done=asyncio.get_running_loop().create_future(),
+        )
+        self.push(job)
+
+        await job.done
+
+    async def take_due(self) -> list[PollJob]:
+        now = time.monotonic()
+        by_provider: dict[str, list[PollJob]] = {}
+
+        while self.heap and self.heap[0].due <= now:
+            job = heapq.heappop(self.heap)
+            by_provider.setdefault(job.provider, []).append(job)
+
+        due: list[PollJob] = []
+        for provider, jobs in by_provider.items():
+            try:
+                granted = await take_budget(
+                    provider, len(jobs), self.policy(provider).rate_limit
+                )
+            except Exception as error:
+                print(f"{provider} polling budget is unavailable: {error}")
+                granted = 0
+
+            due.extend(jobs[:granted])
+            # the provider's budget is exhausted, try in the next second
+            for job in jobs[granted:]:
+                job.due = now + 1 - time.time() % 1
+                heapq.heappush(self.heap, job)
+
+        return due
+
+    @staticmethod
+    def give_up(job: PollJob, message: str, status: OrderStatus) -> None:
+        if not job.done.done():
+            job.done.set_exception(TrackingError(message, status))
+
+    async def execute(self, job: PollJob) -> None:
+        policy = self.policy(job.provider)
+        name = f"{job.provider} order {job.external_id}"
+
+        try:
+            status = await self.poll(job)
+        except Exception as error:
+            print(f"[{job.order_id}] {job.provider} polling failed: {error}")
+            job.failures += 1
+            if job.failures >= policy.max_failures:
+                return self.give_up(
+                    job,
+                    f"{name} polling failed {job.failures} times: {error}",
+                    OrderStatus.FAILED,
+                )
+            # the provider is unavailable, do not hammer it
+            job.interval = min(job.interval * policy.backoff, policy.max_interval)
+        else:
+            job.failures = 0
+            if status == OrderStatus.COOKED:
+                if not job.done.done():
+                    job.done.set_result(None)
+                return
+            if status not in ACTIVE_STATUSES:
+                return self.give_up(job, f"{name} is {status}", status)
+            job.interval = self.next_interval(job, status)
+
+        # nobody waits for the order anymore
+        if job.done.done():
+            return
+
+        if time.monotonic() - job.started_at > policy.timeout:
+            return self.give_up(
+                job, f"{name} is not cooked in {policy.timeout}s", OrderStatus.FAILED
+            )
+
+        job.due = time.monotonic() + job.interval
+        self.push(job)
+
+    async def run(self) -> None:
+        while True:
+            self.wakeup.clear()
+
+            # all due polls are started together, slow ones don't block others
+            if jobs := await self.take_due():
+                for job in jobs:
+                    task = asyncio.create_task(self.execute(job))
+                    self.running.add(task)
+                    task.add_done_callback(self.running.discard)
+                continue
+
+            timeout = self.heap[0].due - time.monotonic() if self.heap else None
+            try:
+                await asyncio.wait_for(self.wakeup.wait(), timeout=timeout)
+            except asyncio.TimeoutError:
+                pass
@@ -1,169 +1,472 @@
-from time import sleep
-from dataclasses import dataclass, field, asdict
-from django.db.models import QuerySet
+import asyncio
+import weakref
 
-from shared.cache import CacheService
+from asgiref.sync import sync_to_async
+from django.db import transaction
+from django.forms.models import model_to_dict
+
+from shared.cache import CacheService, TieredCacheService
+from shared.queue import QueueService
 
 from .models import Order, Restaurant, OrderItem
 from .enums import OrderStatus
-from .providers import silpo
-from .mapper import RESTAURANT_EXTERNAL_TO_INTERNAL
+from .delivery import save_location
+from .events import publish_order_event
+from .providers import kfc, silpo, uklon
+from .mapper import DELIVERY_EXTERNAL_TO_INTERNAL, RESTAURANT_EXTERNAL_TO_INTERNAL
+from .scheduler import (
+    ACTIVE_STATUSES,
+    PollJob,
+    PollScheduler,
+    ProviderPolicy,
+    TrackingError,
+)
+from .tracking import (
+    STATUS_ALL_COOKED,
+    STATUS_NOT_FOUND,
+    ExternalOrder,
+    create_tracking_order,
+    get_tracking_order,
+    set_delivery,
+    set_external_id,
+    set_restaurant_status,
+)
+
+
+# restaurant name (lowercase) -> provider module with the client & structures
+RESTAURANT_PROVIDERS = {
+    "silpo": silpo,
+    "kfc": kfc,
+}
+
+# delivery provider name -> provider module with the client & structures
+DELIVERY_PROVIDERS = {
+    "uklon": uklon,
+}
+
+
+def get_restaurant(name: str) -> Restaurant:
+    """Get the restaurant by name from the local cache, Redis or the database."""
+
+    payload: dict = TieredCacheService().get_or_set(
+        namespace="restaurants",
+        key=name.lower(),
+        default=lambda: model_to_dict(Restaurant.objects.get(name__iexact=name)),
+        ttl=60 * 60,
+    )
+
+    return Restaurant(**payload)
+
+
+# providers that notify about status changes with `POST /webhooks/<provider>`
+PUSH_PROVIDERS = {"kfc"}
+
+
+def track_external_order(
+    provider: str, external_id: str, order_id: int, restaurant_id: int
+) -> None:
+    """Save the external id and remember which order it belongs to."""
+
+    with CacheService().pipeline(transaction=True) as batch:
+        batch.set(
+            namespace="external_orders",
+            key=f"{provider}:{external_id}",
+            value=ExternalOrder(order_id=order_id, restaurant_id=restaurant_id),
+            ttl=60 * 60 * 24,
+        )
+        set_external_id(order_id, restaurant_id, external_id, cache=batch)
 
 
-@dataclass
-class TrackingOrder:
+def find_external_order(provider: str, external_id: str) -> ExternalOrder | None:
+    return CacheService().get(
+        namespace="external_orders",
+        key=f"{provider}:{external_id}",
+        structure=ExternalOrder,
+    )
+
+
+ORDERS_QUEUE = "orders"
+DELIVERIES_QUEUE = "deliveries"
+# failed orders are retried, then moved to the `<queue>:dead` queue
+ORDER_MAX_ATTEMPTS = 5
+
+
+def apply_restaurant_status(
+    order_id: int, restaurant_id: int, status: OrderStatus
+) -> bool:
+    """Update the restaurant status of the tracking order.
+
+    Returns `True` if the status has changed. When all restaurants
+    have cooked their parts, the order in the database is `COOKED` as well
+    and it is handed over to the delivery workers.
     """
-    {
-        17: {
-            restaurants: {
-                1: {  // internal restaurant id
-                    status: NOT_STARTED, // internal
-                    external_id: 13,
-                    request_body: {...},
-                },
-                2: {  // internal restaurant id
-                    status: NOT_STARTED, // internal
-                    external_id: edf055b8-06e8-40ed-ab35-300fef3e0a5d,
-                    request_body: {...},
-                },
-            },
-            delivery: {...}
-        },
-        18: ...
-    }
+
+    result: int = set_restaurant_status(order_id, restaurant_id, status)
+
+    if result == STATUS_NOT_FOUND:
+        raise ValueError(f"No restaurant {restaurant_id} in order {order_id}")
+
+    if result > 0:
+        print(f"[{order_id}] restaurant {restaurant_id} status changed to {status}")
+        publish_order_event(
+            order_id,
+            {"type": "restaurant", "restaurant_id": restaurant_id, "status": status},
+        )
+
+    if result == STATUS_ALL_COOKED:
+        print(f"🍳 ORDER {order_id} IS COOKED")
+        Order.objects.filter(pk=order_id).update(status=OrderStatus.COOKED)
+        publish_order_event(order_id, {"type": "order", "status": OrderStatus.COOKED})
+        QueueService().push(name=DELIVERIES_QUEUE, value={"order_id": order_id})
+
+    return result > 0
+
+
+def fail_restaurant_order(
+    order_id: int, restaurant_id: int, status: OrderStatus
+) -> None:
+    """The restaurant won't cook its part, so the whole order has failed."""
+
+    apply_restaurant_status(order_id, restaurant_id, status)
+    Order.objects.filter(pk=order_id).update(status=status)
+    publish_order_event(order_id, {"type": "order", "status": status})
+
+
+def retry_order(
+    name: str, value: dict, error: Exception, queue: QueueService | None = None
+) -> bool:
+    """Put the failed order back to the queue, `False` if it is dead.
+
+    The dead order goes to `<name>:dead`, see `fail_order()`.
     """
 
-    restaurants: dict = field(default_factory=dict)
-    delivery: dict = field(default_factory=dict)
+    value = value | {
+        "attempts": value.get("attempts", 0) + 1,
+        "errors": [*value.get("errors", []), f"{type(error).__name__}: {error}"],
+    }
+
+    alive = value["attempts"] < ORDER_MAX_ATTEMPTS
+    (queue or QueueService()).push(name=name if alive else f"{name}:dead", value=value)
+
+    return alive
+
+
+def fail_order(order_id: int) -> None:
+    """The dead order is `FAILED`, nobody is going to process it anymore."""
+
+    Order.objects.filter(pk=order_id).update(status=OrderStatus.FAILED)
+    publish_order_event(order_id, {"type": "order", "status": OrderStatus.FAILED})
+
+
+def apply_delivery_status(order_id: int, status: OrderStatus) -> None:
+    print(f"🚗 ORDER {order_id} delivery status changed to {status}")
+    Order.objects.filter(pk=order_id).update(status=status)
+    publish_order_event(order_id, {"type": "order", "status": status})
+
+
+# polling budget and the usual cooking time of the providers
+POLLING_POLICIES = {
+    "silpo": ProviderPolicy(rate_limit=50, expected_time=10),
+    # webhooks deliver the status, a rare poll only recovers a lost one
+    "kfc": ProviderPolicy(expected_time=60, min_interval=60, max_interval=5 * 60),
+}
 
 
-def all_orders_cooked(order_id: int):
-    cache = CacheService()
-    tracking_order = TrackingOrder(**cache.get(namespace="orders", key=str(order_id)))
-    print(f"Checking if al lorders are cooked: {tracking_order.restaurants}")
+async def poll_restaurant_order(job: PollJob) -> OrderStatus:
+    """Retrieve the order from the provider and save its status."""
 
-    results = all(
-        (
-            payload["status"] == OrderStatus.COOKED
-            for _, payload in tracking_order.restaurants.items()
+    if job.provider in PUSH_PROVIDERS:
+        # the webhook has most likely delivered the status, no request then
+        tracking_order = await sync_to_async(get_tracking_order)(job.order_id)
+        restaurant_order = (
+            tracking_order.restaurants.get(str(job.restaurant_id), {})
+            if tracking_order is not None
+            else {}
         )
+        if (status := restaurant_order.get("status")) not in (None, *ACTIVE_STATUSES):
+            return OrderStatus(status)
+
+    client = RESTAURANT_PROVIDERS[job.provider].Client
+    response = await client.aget_order(job.external_id)
+    status = RESTAURANT_EXTERNAL_TO_INTERNAL[job.provider][response.status]
+    print(f"Tracking for {job.provider} Order with HTTP GET /orders: {status}")
+
+    await sync_to_async(apply_restaurant_status)(
+        job.order_id, job.restaurant_id, status
     )
 
-    return results
+    return status
+
+
+async def close_provider_clients() -> None:
+    """Close the providers' connection pools of the running event loop."""
+
+    for module in (*RESTAURANT_PROVIDERS.values(), *DELIVERY_PROVIDERS.values()):
+        await module.Client.aclose()
+
+
+# one scheduler for every event loop (dispatcher process)
+_poll_schedulers: weakref.WeakKeyDictionary = weakref.WeakKeyDictionary()
 
 
-def order_in_silpo(order_id: int, items: QuerySet[OrderItem]):
-    """Short polling requests to the Silpo API
+def get_poll_scheduler() -> PollScheduler:
+    loop = asyncio.get_running_loop()
+
+    if loop not in _poll_schedulers:
+        _poll_schedulers[loop] = PollScheduler(
+            poll=poll_restaurant_order, policies=POLLING_POLICIES
+        )
+
+    return _poll_schedulers[loop]
+
+
+async def order_in_restaurant(provider: str, order_id: int, items: list[OrderItem]):
+    """Submit the order to the restaurant API and track it
 
     NOTES
     get order from cache
     is external_id?
       no: make order
-      yes: get order
+    wait until it's cooked with the central scheduler
+      push provider: the webhook updates the status, rare polls are only
+      a safety net for a lost webhook
     """
 
-    client = silpo.Client()
-    cache = CacheService()
-    restaurant = Restaurant.objects.get(name="Silpo")
+    restaurant = await sync_to_async(get_restaurant)(provider)
+    module = RESTAURANT_PROVIDERS[provider]
+    client = module.Client
 
-    def get_internal_status(status: silpo.OrderStatus) -> OrderStatus:
-        return RESTAURANT_EXTERNAL_TO_INTERNAL["silpo"][status]
+    def get_internal_status(status: str) -> OrderStatus:
+        return RESTAURANT_EXTERNAL_TO_INTERNAL[provider][status]
 
-    cooked = False
-    while not cooked:
-        sleep(1)  # just a delay
+    # GET ITEM FROM THE CACHE
+    tracking_order = await sync_to_async(get_tracking_order)(order_id)
+    if tracking_order is None:
+        raise ValueError(f"Order {order_id} is not in processing")
+    # validate
+    restaurant_order = tracking_order.restaurants.get(str(restaurant.pk))
+    if not restaurant_order:
+        raise ValueError(f"No {restaurant.name} in orders processing")
 
-        # GET ITEM FROM THE CACHE
-        tracking_order = TrackingOrder(
-            **cache.get(namespace="orders", key=str(order_id))
-        )
-        # validate
-        silpo_order = tracking_order.restaurants.get(str(restaurant.pk))
-        if not silpo_order:
-            raise ValueError("No Silpo in orders processing")
-
-        # PRINT CURRENT STATUS
-        print(f"CURRENT SILPO ORDER STATUS: {silpo_order['status']}")
-
-        if not silpo_order["external_id"]:
-            # ✨ MAKE THE FIRST REQUEST IF NOT STARTED
-            response: silpo.OrderResponse = client.create_order(
-                silpo.OrderRequestBody(
-                    order=[
-                        silpo.OrderItem(dish=item.dish.name, quantity=item.quantity)
-                        for item in items
-                    ]
-                )
-            )
-            internal_status: OrderStatus = get_internal_status(response.status)
-
-            # UPDATE CACHE WITH EXTERNAL ID AND STATE
-            tracking_order.restaurants[str(restaurant.pk)] |= {
-                "external_id": response.id,
-                "status": internal_status,
-            }
-            cache.set(
-                namespace="orders", key=str(order_id), value=asdict(tracking_order)
+    # PRINT CURRENT STATUS
+    print(f"CURRENT {provider.upper()} ORDER STATUS: {restaurant_order['status']}")
+
+    external_id: str | None = restaurant_order["external_id"]
+    if not external_id:
+        # ✨ MAKE THE FIRST REQUEST IF NOT STARTED
+        response = await client.acreate_order(
+            module.OrderRequestBody(
+                order=[
+                    module.OrderItem(dish=item.dish.name, quantity=item.quantity)
+                    for item in items
+                ]
             )
-        else:
-            # ✨ IF ALREADY HAVE EXTERNAL ID - JUST RETRIEVE THE ORDER
-            response = client.get_order(order_id)
-            internal_status = get_internal_status(response.status)
-            print("Tracking for Silpo Order with HTTP GET /orders")
+        )
+        external_id = response.id
+        internal_status: OrderStatus = get_internal_status(response.status)
+
+        # UPDATE CACHE WITH EXTERNAL ID AND STATE
+        await sync_to_async(track_external_order)(
+            provider, response.id, order_id, restaurant.pk
+        )
+        await sync_to_async(apply_restaurant_status)(
+            order_id, restaurant.pk, internal_status
+        )
 
-            if silpo_order["status"] != internal_status:  # STATUS HAS CHANGED
-                tracking_order.restaurants[str(restaurant.pk)][
-                    "status"
-                ] = internal_status
-                print(f"Silpo order status changed to {internal_status}")
-                cache.set(
-                    namespace="orders", key=str(order_id), value=asdict(tracking_order)
-                )
-            if internal_status == OrderStatus.COOKED:
-                print("🍳 ORDER IS COOKED")
-                cooked = True
+    if provider in PUSH_PROVIDERS:
+        # ✨ FURTHER UPDATES ARE DELIVERED BY THE PROVIDER'S WEBHOOK
+        print(f"{restaurant.name} order is tracked with webhooks")
 
-                # 🚧 CHECK IF ALL ORDERS ARE COOKED
-                if all_orders_cooked(order_id):
-                    cache.set(
-                        namespace="orders",
-                        key=str(order_id),
-                        value=asdict(tracking_order),
-                    )
+    # ✨ IF ALREADY HAVE EXTERNAL ID - JUST WAIT UNTIL IT IS COOKED
+    try:
+        await get_poll_scheduler().track(
+            provider=provider,
+            external_id=external_id,
+            order_id=order_id,
+            restaurant_id=restaurant.pk,
+        )
+    except TrackingError as error:
+        # final, there is nothing to retry
+        print(f"[{order_id}] {restaurant.name} order is given up: {error}")
+        await sync_to_async(fail_restaurant_order)(
+            order_id, restaurant.pk, error.status
+        )
 
-                    # TODO: 💣 UPDATE DATABASE INSTANCE
 
+async def order_in_silpo(order_id: int, items: list[OrderItem]):
+    await order_in_restaurant("silpo", order_id, items)
 
-def order_in_kfc(order_id: int, items):
-    pass
 
+async def order_in_kfc(order_id: int, items: list[OrderItem]):
+    await order_in_restaurant("kfc", order_id, items)
 
 
+# restaurant name (lowercase) -> function that processes its part of the order
+RESTAURANT_HANDLERS = {
+    "silpo": order_in_silpo,
+    "kfc": order_in_kfc,
+}
+
+
+def create_order(
+    user_id: int, eta, items: list[dict], total: int, delivery_provider: str
+) -> Order:
+    """Save the order with all its items using two INSERT queries.
+
+    items: [{"dish": Dish(...), "quantity": 2}, ...]
+    """
+
+    with transaction.atomic():
+        order = Order.objects.create(
+            status=OrderStatus.NOT_STARTED,
+            user_id=user_id,
+            delivery_provider=delivery_provider,
+            eta=eta,
+            total=total,
+        )
+        OrderItem.objects.bulk_create(
+            [
+                OrderItem(dish=item["dish"], quantity=item["quantity"], order=order)
+                for item in items
+            ]
+        )
+
+    return order
+
 
 def schedule_order(order: Order):
-    # define service3s and data state
-    cache = CacheService()
-    tracking_order = TrackingOrder()
+    """Hand the order over to the dispatcher workers.
+
+    Nothing is processed inside the HTTP request: the order id is pushed
+    to the durable queue and `process_order` is executed by the worker
+    (`python manage.py dispatch_orders`).
+    """
+
+    QueueService().push(name=ORDERS_QUEUE, value={"order_id": order.pk})
+
+
+def prepare_order(order_id: int) -> dict[Restaurant, list[OrderItem]]:
+    """Split the order by restaurants and create the tracking order in the cache.
 
+    All items are fetched with a single query, restaurant handlers work
+    with the lists and never query the items again.
+    """
+
+    order = Order.objects.get(pk=order_id)
     items_by_restaurants = order.items_by_restaurant()
-    for restaurant, items in items_by_restaurants.items():
-        # update tracking order instance to be saved to the cache
-        tracking_order.restaurants[str(restaurant.pk)] = {
-            "external_id": None,
-            "status": OrderStatus.NOT_STARTED,
-        }
-
-    # update cache insatnce only once in the end
-    cache.set(namespace="orders", key=str(order.pk), value=asdict(tracking_order))
-
-    # start processing after cache is complete
-    for restaurant, items in items_by_restaurants.items():
-        match restaurant.name.lower():
-            case "silpo":
-                order_in_silpo(order.pk, items)
-            case "kfc":
-                order_in_kfc(order.pk, items)
-            case _:
-                raise ValueError(
-                    f"Restaurant {restaurant.name} is not available for processing"
-                )
+
+    for restaurant in items_by_restaurants:
+        if restaurant.name.lower() not in RESTAURANT_HANDLERS:
+            raise ValueError(
+                f"Restaurant {restaurant.name} is not available for processing"
+            )
+
+    # the order could be redelivered after the worker crash,
+    # so already known external ids and statuses are kept
+    create_tracking_order(
+        order_id=order.pk,
+        restaurant_ids=[restaurant.pk for restaurant in items_by_restaurants],
+        delivery_provider=order.delivery_provider,
+    )
+
+    return items_by_restaurants
+
+
+async def process_order(order_id: int):
+    """Submit the order to all restaurants at the same time.
+
+    The total processing time is the time of the slowest restaurant,
+    not the sum of all of them.
+    """
+
+    items_by_restaurants = await sync_to_async(prepare_order)(order_id)
+
+    results = await asyncio.gather(
+        *(
+            RESTAURANT_HANDLERS[restaurant.name.lower()](order_id, items)
+            for restaurant, items in items_by_restaurants.items()
+        ),
+        return_exceptions=True,
+    )
+
+    # all restaurants are finished, re-raise the first failure if any
+    for result in results:
+        if isinstance(result, Exception):
+            raise result
+
+
+# seconds between the courier location requests
+DELIVERY_POLL_INTERVAL = 1
+# the courier hasn't delivered the order in time, it is `NOT_DELIVERED`
+DELIVERY_TIMEOUT = 60 * 60 * 2
+
+
+async def process_delivery(order_id: int):
+    """Order the courier for the cooked order and track it until delivered.
+
+    The provider is polled every `DELIVERY_POLL_INTERVAL` seconds: the
+    courier location only goes to Redis (`food.delivery`), the database is
+    updated only when the delivery status changes.
+    """
+
+    tracking_order = await sync_to_async(get_tracking_order)(order_id)
+    if tracking_order is None:
+        raise ValueError(f"Order {order_id} is not in processing")
+
+    delivery: dict = tracking_order.delivery
+    provider: str | None = delivery.get("provider")
+    if provider not in DELIVERY_PROVIDERS:
+        raise ValueError(f"Delivery provider {provider} is not available")
+
+    module = DELIVERY_PROVIDERS[provider]
+    client = module.Client
+
+    # the order could be redelivered after the worker crash,
+    # so the courier is ordered only once
+    external_id: str | None = delivery.get("external_id")
+    if not external_id:
+        restaurants = Restaurant.objects.filter(pk__in=tracking_order.restaurants)
+        pickups = [pickup async for pickup in restaurants.only("name", "address")]
+
+        response = await client.acreate_order(
+            module.OrderRequestBody(
+                addresses=[pickup.address for pickup in pickups],
+                comments=[f"Order {order_id}: {pickup.name}" for pickup in pickups],
+            )
+        )
+        external_id = response.id
+        await sync_to_async(set_delivery)(
+            order_id, delivery | {"external_id": external_id}
+        )
+
+    deadline = asyncio.get_running_loop().time() + DELIVERY_TIMEOUT
+    status: OrderStatus | None = None
+
+    while status != OrderStatus.DELIVERED:
+        if asyncio.get_running_loop().time() > deadline:
+            # final, the order is not retried
+            print(f"[{order_id}] {provider} has not delivered the order in time")
+            await sync_to_async(apply_delivery_status)(
+                order_id, OrderStatus.NOT_DELIVERED
+            )
+            return
+
+        try:
+            response = await client.aget_order(external_id)
+        except Exception as error:
+            # the provider is unavailable, try again with the next poll
+            print(f"[{order_id}] {provider} tracking failed: {error}")
+        else:
+            if response.location:
+                await sync_to_async(save_location)(order_id, response.location)
+
+            current = DELIVERY_EXTERNAL_TO_INTERNAL[provider].get(response.status)
+            if current is None:
+                # e.g. a new provider status, keep the known one
+                print(f"[{order_id}] {provider} unknown status: {response.status}")
+            elif current != status:
+                status = current
+                await sync_to_async(apply_delivery_status)(order_id, status)
+
+        if status != OrderStatus.DELIVERED:
+            await asyncio.sleep(DELIVERY_POLL_INTERVAL)
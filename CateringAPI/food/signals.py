@@ -0,0 +1,43 @@
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+
+from shared.cache import TieredCacheService
+
+from .menu import invalidate_menu_snapshot
+from .models import Dish, Restaurant
+
+
+@receiver(pre_save, sender=Restaurant)
+def remember_restaurant_name(sender, instance: Restaurant, **kwargs):
+    """The name the restaurant is cached under, it may be renamed."""
+
+    instance._saved_name = (  # type: ignore[attr-defined]
+        Restaurant.objects.filter(pk=instance.pk).values_list("name", flat=True).first()
+        if instance.pk is not None
+        else None
+    )
+
+
+@receiver([post_save, post_delete], sender=Restaurant)
+def invalidate_restaurant(sender, instance: Restaurant, **kwargs):
+    """Drop the cached restaurant in all processes, once the change is saved."""
+
+    names = {instance.name.lower()}
+    if saved_name := getattr(instance, "_saved_name", None):
+        # renamed, the old name is cached as well
+        names.add(saved_name.lower())
+
+    def delete():
+        for name in names:
+            TieredCacheService().delete(namespace="restaurants", key=name)
+
+    transaction.on_commit(delete)
+
+
+@receiver([post_save, post_delete], sender=Restaurant)
+@receiver([post_save, post_delete], sender=Dish)
+def invalidate_menu(sender, **kwargs):
+    """The menu snapshot is outdated once the change is saved."""
+
+    transaction.on_commit(invalidate_menu_snapshot)
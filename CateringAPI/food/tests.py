@@ -1,3 +1,746 @@
-from django.test import TestCase
+import asyncio
+import hashlib
+import hmac
+import io
+import json
+from datetime import date, timedelta
+from unittest import mock
 
-# Create your tests here.
+from asgiref.sync import sync_to_async
+from django.test import TestCase, modify_settings, override_settings
+from rest_framework.test import APIClient
+
+from shared.cache import CacheService, TieredCacheService
+from shared.queue import Message, QueueService
+from users.authentication import TokenObtainPairSerializer
+from users.models import Role, User
+
+from .delivery import LOCATION_TTL, get_location, save_location
+from .enums import OrderStatus
+from .events import (
+    format_event,
+    location_key,
+    order_channel,
+    publish_order_event,
+    stream_order_events,
+)
+from . import events, exporters
+from .importers import import_dishes
+from .menu import MENU_GENERATION_KEY, MENU_SNAPSHOT_KEY, invalidate_menu_snapshot
+from .management.commands.dispatch_orders import Command as DispatchOrdersCommand
+from .providers import kfc
+from .scheduler import (
+    PollJob,
+    PollScheduler,
+    ProviderPolicy,
+    TrackingError,
+    take_budget,
+)
+from .services import (
+    ORDER_MAX_ATTEMPTS,
+    ORDERS_QUEUE,
+    close_provider_clients,
+    poll_restaurant_order,
+)
+from .tracking import create_tracking_order, get_tracking_order, set_restaurant_status
+from .models import Dish, Order, OrderItem, Restaurant
+
+
+class OrderItemsByRestaurantTestCase(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create(
+            email="john@catering.com",
+            phone_number="0990000000",
+            first_name="John",
+            last_name="Doe",
+        )
+        cls.order = Order.objects.create(
+            user=cls.user, eta=date.today() + timedelta(days=1)
+        )
+
+        for name in ("Silpo", "KFC", "Bueno"):
+            restaurant = Restaurant.objects.create(name=name, address="Kyiv")
+            for price in (100, 200):
+                dish = Dish.objects.create(
+                    name=f"{name} {price}", price=price, restaurant=restaurant
+                )
+                OrderItem.objects.create(order=cls.order, dish=dish, quantity=1)
+
+    def test_in_memory_grouping_takes_single_query(self):
+        with self.assertNumQueries(1):
+            results = self.order.items_by_restaurant()
+
+            for restaurant, items in results.items():
+                for item in items:
+                    self.assertEqual(item.dish.restaurant, restaurant)
+
+        self.assertEqual(len(results), 3)
+        self.assertEqual(sum(len(items) for items in results.values()), 6)
+
+    def test_lazy_grouping_returns_querysets(self):
+        results = self.order.items_by_restaurant(in_memory=False)
+
+        self.assertEqual(
+            {restaurant.name: items.count() for restaurant, items in results.items()},
+            {"Silpo": 2, "KFC": 2, "Bueno": 2},
+        )
+
+
+class OrdersListTestCase(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create(
+            email="admin@catering.com",
+            phone_number="0990000001",
+            first_name="Admin",
+            last_name="Admin",
+            role=Role.ADMIN,
+        )
+        restaurant = Restaurant.objects.create(name="Silpo", address="Kyiv")
+        dishes = Dish.objects.bulk_create(
+            [Dish(name=f"Dish {i}", price=10, restaurant=restaurant) for i in range(3)]
+        )
+        orders = Order.objects.bulk_create(
+            [
+                Order(user=cls.admin, eta=date.today() + timedelta(days=1), total=30)
+                for _ in range(100)
+            ]
+        )
+        OrderItem.objects.bulk_create(
+            [
+                OrderItem(order=order, dish=dish, quantity=1)
+                for order in orders
+                for dish in dishes
+            ]
+        )
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.admin)
+
+    def test_orders_list_queries_count_does_not_depend_on_orders(self):
+        # orders, items (no COUNT with the cursor pagination)
+        with self.assertNumQueries(2):
+            response = self.client.get("/food/orders/", {"limit": 100})
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.data["results"]), 100)
+        self.assertEqual(len(response.data["results"][0]["items"]), 3)
+
+    def test_orders_list_authorized_by_token_claims(self):
+        token = TokenObtainPairSerializer.get_token(self.admin).access_token
+        client = APIClient()
+        client.credentials(HTTP_AUTHORIZATION=f"Bearer {token}")
+
+        # orders, items (no users query)
+        with self.assertNumQueries(2):
+            response = client.get("/food/orders/", {"limit": 10})
+
+        self.assertEqual(response.status_code, 200)
+
+    @modify_settings(MIDDLEWARE={"prepend": "shared.metrics.RequestMetricsMiddleware"})
+    def test_orders_list_metrics_headers(self):
+        response = self.client.get("/food/orders/", {"limit": 10})
+
+        self.assertEqual(response["X-DB-Queries"], "2")
+        self.assertIn("db;dur=", response["Server-Timing"])
+
+    def test_orders_list_cursor_pages_with_filters(self):
+        Order.objects.filter(id__in=Order.objects.order_by("id")[:10]).update(
+            status=OrderStatus.COOKING
+        )
+        ids: list[int] = []
+
+        url = "/food/orders/?status=cooking&limit=4"
+        while url:
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, 200)
+            ids.extend(order["id"] for order in response.data["results"])
+            url = response.data["next"]
+
+        expected = Order.objects.filter(status=OrderStatus.COOKING).order_by("-id")
+        self.assertEqual(ids, [order.pk for order in expected])
+
+    def test_orders_list_unknown_status(self):
+        response = self.client.get("/food/orders/", {"status": "burnt"})
+
+        self.assertEqual(response.status_code, 400)
+
+    def test_orders_list_ignores_not_filter_params(self):
+        response = self.client.get(
+            "/food/orders/", {"format": "json", "status": "cooking", "_": "1760659200"}
+        )
+
+        self.assertEqual(response.status_code, 200)
+
+
+class ImportDishesTestCase(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.silpo = Restaurant.objects.create(name="Silpo", address="Kyiv")
+        cls.kfc = Restaurant.objects.create(name="KFC Khreshchatyk", address="Kyiv")
+
+    def test_import_dishes_in_batches_with_row_errors(self):
+        file = io.BytesIO(
+            "\ufeffname,price,restaurant\n"
+            "Borscht,120,silpo\n"
+            "Twister,abc,KFC\n"
+            "Bucket,300,kfc\n"
+            "Sushi,200,Unknown\n"
+            "Pizza,150\n"
+            "Varenyky,90,Silpo\n".encode()
+        )
+
+        # restaurants, 2 batches
+        with self.assertNumQueries(3):
+            report = import_dishes(file, batch_size=2)
+
+        self.assertEqual(report.created, 3)
+        self.assertEqual(report.failed, 3)
+        self.assertEqual([line for line, _ in report.errors], [3, 5, 6])
+        self.assertEqual(
+            list(Dish.objects.order_by("id").values_list("name", "restaurant")),
+            [
+                ("Borscht", self.silpo.pk),
+                ("Bucket", self.kfc.pk),
+                ("Varenyky", self.silpo.pk),
+            ],
+        )
+
+
+class ExportTestCase(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create(
+            email="admin@catering.com",
+            phone_number="0990000001",
+            first_name="Admin",
+            last_name="Admin",
+            role=Role.ADMIN,
+        )
+        restaurant = Restaurant.objects.create(name="Silpo", address="Kyiv")
+        cls.dish = Dish.objects.create(name="Borscht", price=120, restaurant=restaurant)
+        cls.today = date.today()
+        cls.orders = Order.objects.bulk_create(
+            [
+                Order(user=cls.admin, eta=cls.today + timedelta(days=days))
+                for days in (0, 1, 2)
+            ]
+        )
+        OrderItem.objects.bulk_create(
+            [
+                OrderItem(order=cls.orders[0], dish=cls.dish, quantity=1),
+                OrderItem(order=cls.orders[0], dish=cls.dish, quantity=2),
+                OrderItem(order=cls.orders[2], dish=cls.dish, quantity=3),
+            ]
+        )
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.admin)
+
+    def test_export_dishes_csv(self):
+        response = self.client.get("/food/export/dishes/")
+
+        self.assertEqual(response["Content-Type"], "text/csv")
+        self.assertEqual(
+            b"".join(response.streaming_content).decode().splitlines(),
+            [
+                "id,name,price,restaurant_id,restaurant",
+                f"{self.dish.pk},Borscht,120,{self.dish.restaurant_id},Silpo",
+            ],
+        )
+
+    def test_export_orders_ndjson_by_eta(self):
+        response = self.client.get(
+            "/food/export/orders/",
+            {
+                "output": "ndjson",
+                "from": str(self.today),
+                "to": str(self.today + timedelta(days=1)),
+            },
+        )
+
+        orders = [
+            json.loads(line)
+            for line in b"".join(response.streaming_content).splitlines()
+        ]
+        self.assertEqual(
+            [order["id"] for order in orders], [self.orders[0].pk, self.orders[1].pk]
+        )
+        self.assertEqual([item["quantity"] for item in orders[0]["items"]], [1, 2])
+        self.assertEqual(orders[1]["items"], [])
+
+    @mock.patch.object(exporters, "EXPORT_BUFFER_SIZE", 1)
+    def test_export_is_streamed(self):
+        response = self.client.get("/food/export/orders/")
+
+        self.assertTrue(response.streaming)
+        # the header & a line per order item, every line is sent at once
+        self.assertEqual(len(list(response.streaming_content)), 5)
+
+    @mock.patch.object(exporters, "EXPORT_BUFFER_SIZE", 1)
+    async def test_export_is_streamed_under_asgi(self):
+        token = TokenObtainPairSerializer.get_token(self.admin).access_token
+
+        response = await self.async_client.get(
+            "/food/export/orders/", headers={"Authorization": f"Bearer {token}"}
+        )
+
+        # an async iterator is sent chunk by chunk, not collected to a list
+        self.assertTrue(response.is_async)
+        chunks = [chunk async for chunk in response.streaming_content]
+        self.assertEqual(len(chunks), 5)
+
+
+class OrderEventsTestCase(TestCase):
+    def test_order_events_are_streamed_to_the_owner_only(self):
+        owner, other = User.objects.bulk_create(
+            [
+                User(
+                    email=f"user{i}@catering.com",
+                    phone_number=f"09900000{i:02}",
+                    first_name="John",
+                    last_name="Doe",
+                )
+                for i in range(2)
+            ]
+        )
+        order = Order.objects.create(user=owner, eta=date.today())
+        url = f"/food/orders/{order.pk}/events"
+
+        self.assertEqual(self.client.get(url).status_code, 401)
+
+        token = TokenObtainPairSerializer.get_token(other).access_token
+        self.assertEqual(self.client.get(url, {"token": str(token)}).status_code, 404)
+
+        # the other endpoints accept the header only
+        response = self.client.get(f"/food/orders/{order.pk}/", {"token": str(token)})
+        self.assertEqual(response.status_code, 401)
+
+
+class OrderEventsStreamTestCase(TestCase):
+    async def test_events_are_streamed_until_the_final_status(self):
+        self.addCleanup(CacheService().connection.delete, location_key(18))
+        save_location(18, [50.45, 30.52])
+
+        async def current_status():
+            return OrderStatus.COOKING
+
+        stream = stream_order_events(18, current_status)
+        with mock.patch.object(events, "KEEPALIVE_INTERVAL", 0.1):
+            self.assertEqual(
+                await anext(stream),
+                b'event: order\ndata: {"type": "order", "status": "cooking"}\n\n',
+            )
+            self.assertEqual(
+                await anext(stream),
+                b'event: location\ndata: {"type": "location", '
+                b'"location": [50.45, 30.52]}\n\n',
+            )
+            self.assertEqual(await anext(stream), b": keep-alive\n\n")
+
+            publish_order_event(18, {"type": "order", "status": "delivered"})
+            self.assertEqual(
+                await anext(stream),
+                format_event({"type": "order", "status": "delivered"}),
+            )
+            with self.assertRaises(StopAsyncIteration):
+                await anext(stream)
+
+    async def test_owner_gets_the_stream(self):
+        user = await User.objects.acreate(
+            email="events@catering.com", phone_number="0993333301"
+        )
+        order = await Order.objects.acreate(
+            user=user, eta=date.today(), status=OrderStatus.DELIVERED
+        )
+        token = TokenObtainPairSerializer.get_token(user).access_token
+
+        response = await self.async_client.get(
+            f"/food/orders/{order.pk}/events", {"token": str(token)}
+        )
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response["Content-Type"], "text/event-stream")
+        # the order is final, the stream is closed after its status
+        self.assertEqual(
+            [chunk async for chunk in response.streaming_content],
+            [format_event({"type": "order", "status": "delivered"})],
+        )
+
+
+class CourierLocationTestCase(TestCase):
+    def test_location_is_published_only_when_changed(self):
+        connection = CacheService().connection
+        self.addCleanup(connection.delete, location_key(17))
+        pubsub = connection.pubsub()
+        pubsub.subscribe(order_channel(17))
+        self.addCleanup(pubsub.close)
+        # the subscription confirmation
+        pubsub.get_message(timeout=1)
+
+        # location updates never touch the database
+        with self.assertNumQueries(0):
+            self.assertTrue(save_location(17, [50.45, 30.52]))
+            self.assertFalse(save_location(17, [50.45, 30.52]))
+            self.assertTrue(save_location(17, [50.46, 30.52]))
+
+        events = []
+        while (message := pubsub.get_message(timeout=0.1)) is not None:
+            events.append(json.loads(message["data"]))
+
+        self.assertEqual(
+            events,
+            [
+                {"type": "location", "location": [50.45, 30.52]},
+                {"type": "location", "location": [50.46, 30.52]},
+            ],
+        )
+        self.assertEqual(get_location(17), [50.46, 30.52])
+        self.assertLessEqual(connection.ttl(location_key(17)), LOCATION_TTL)
+
+
+class AsyncOrderViewsTestCase(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.owner, cls.other = User.objects.bulk_create(
+            [
+                User(
+                    email=f"customer{i}@catering.com",
+                    phone_number=f"09911111{i:02}",
+                    first_name="John",
+                    last_name="Doe",
+                )
+                for i in range(2)
+            ]
+        )
+        restaurant = Restaurant.objects.create(name="Silpo", address="Kyiv")
+        cls.dish = Dish.objects.create(name="Borscht", price=120, restaurant=restaurant)
+
+    def headers(self, user: User) -> dict:
+        token = TokenObtainPairSerializer.get_token(user).access_token
+        return {"HTTP_AUTHORIZATION": f"Bearer {token}"}
+
+    def test_create_and_retrieve_order(self):
+        # the working queue may have consumers, the test one has none
+        queue, name = QueueService(), f"test:{ORDERS_QUEUE}"
+        self.addCleanup(
+            queue.connection.delete,
+            queue._build_key(name),
+            queue._build_processing_key(name, "test"),
+        )
+        payload = {
+            "eta": str(date.today() + timedelta(days=2)),
+            "delivery_provider": "uklon",
+            "items": [{"dish": self.dish.pk, "quantity": 2}],
+        }
+
+        with mock.patch("food.services.ORDERS_QUEUE", name):
+            response = self.client.post(
+                "/food/orders/",
+                payload,
+                "application/json",
+                **self.headers(self.owner),
+            )
+        self.assertEqual(response.status_code, 201)
+        order = response.json()
+        self.assertEqual(order["total"], 240)
+
+        message = queue.pop(name=name, consumer="test", timeout=1)
+        self.assertEqual(message.value, {"order_id": order["id"]})
+        queue.ack(message)
+
+        url = f"/food/orders/{order['id']}/"
+        response = self.client.get(url, **self.headers(self.owner))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            response.json()["items"], [{"dish": self.dish.pk, "quantity": 2}]
+        )
+
+        self.assertEqual(
+            self.client.get(url, **self.headers(self.other)).status_code, 404
+        )
+        self.assertEqual(self.client.get(url).status_code, 401)
+
+    def test_create_order_validation_errors(self):
+        payload = {"eta": str(date.today()), "delivery_provider": "uber", "items": []}
+
+        response = self.client.post(
+            "/food/orders/", payload, "application/json", **self.headers(self.owner)
+        )
+
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(set(response.json()), {"eta", "delivery_provider"})
+
+
+class DispatchOrdersRetryTestCase(TestCase):
+    async def test_failed_order_is_retried_then_moved_to_dead_letters(self):
+        user = await User.objects.acreate(
+            email="retry@catering.com", phone_number="0992222201"
+        )
+        order = await Order.objects.acreate(user=user, eta=date.today())
+
+        queue = QueueService()
+        name = f"test:{ORDERS_QUEUE}"
+        self.addCleanup(queue.connection.delete, f"queue:{name}", f"queue:{name}:dead")
+        queue.push(name=name, value={"order_id": order.pk})
+
+        async def handler(order_id: int):
+            raise ConnectionError("Provider is down")
+
+        command = DispatchOrdersCommand(stdout=io.StringIO(), stderr=io.StringIO())
+        command.retry_delay = 0
+
+        for _ in range(ORDER_MAX_ATTEMPTS):
+            message = queue.pop(name=name, consumer="test", timeout=1)
+            await command.process(handler, queue, message, asyncio.Semaphore(0))
+
+        self.assertEqual(queue.depth(name), 0)
+        self.assertEqual(queue.connection.llen(f"queue:{name}:processing:test"), 0)
+
+        dead = json.loads(queue.connection.lpop(f"queue:{name}:dead"))
+        self.assertEqual(dead["attempts"], ORDER_MAX_ATTEMPTS)
+        self.assertEqual(dead["errors"][-1], "ConnectionError: Provider is down")
+
+        await order.arefresh_from_db()
+        self.assertEqual(order.status, OrderStatus.FAILED)
+
+    async def test_dead_order_is_acknowledged_when_it_is_not_marked_failed(self):
+        queue = QueueService()
+        name = f"test:{ORDERS_QUEUE}"
+        processing = f"queue:{name}:processing:test"
+        self.addCleanup(queue.connection.delete, f"queue:{name}:dead", processing)
+        queue.push(name=name, value={"order_id": 1, "attempts": ORDER_MAX_ATTEMPTS - 1})
+
+        async def handler(order_id: int):
+            raise ConnectionError("Provider is down")
+
+        command = DispatchOrdersCommand(stdout=io.StringIO(), stderr=io.StringIO())
+        command.retry_delay = 0
+        message = queue.pop(name=name, consumer="test", timeout=1)
+
+        with mock.patch(
+            "food.management.commands.dispatch_orders.fail_order",
+            side_effect=ConnectionError("Database is down"),
+        ):
+            await command.process(handler, queue, message, asyncio.Semaphore(0))
+
+        # dead already, `recover()` must not return the duplicate
+        self.assertEqual(queue.connection.llen(processing), 0)
+        self.assertEqual(queue.depth(f"{name}:dead"), 1)
+        self.assertIn("is not marked failed", command.stderr.getvalue())
+
+    async def test_slot_is_free_while_the_order_waits_for_retry(self):
+        async def handler(order_id: int):
+            raise ConnectionError("Provider is down")
+
+        command = DispatchOrdersCommand(stdout=io.StringIO(), stderr=io.StringIO())
+        command.retry_delay = 60
+        message = Message(queue="test:orders", consumer="test", raw=b'{"order_id": 1}')
+        slots = asyncio.Semaphore(0)
+
+        task = asyncio.create_task(
+            command.process(handler, QueueService(), message, slots)
+        )
+        await asyncio.wait_for(slots.acquire(), 5)
+
+        # still waiting, but the next order can be taken
+        self.assertFalse(task.done())
+        task.cancel()
+
+
+class PushProviderPollTestCase(TestCase):
+    def setUp(self):
+        connection = CacheService().connection
+        self.addCleanup(connection.delete, "orders:19", "queue:test:deliveries")
+        create_tracking_order(19, [1])
+        self.job = PollJob(
+            due=0,
+            seq=0,
+            provider="kfc",
+            external_id="ext",
+            order_id=19,
+            restaurant_id=1,
+            started_at=0,
+            interval=60,
+            done=None,
+        )
+
+    async def test_webhook_status_is_taken_from_the_cache(self):
+        await sync_to_async(set_restaurant_status)(19, 1, OrderStatus.COOKED)
+
+        with mock.patch.object(kfc.Client, "aget_order") as aget_order:
+            status = await poll_restaurant_order(self.job)
+
+        self.assertEqual(status, OrderStatus.COOKED)
+        aget_order.assert_not_called()
+
+    async def test_lost_webhook_is_recovered_by_polling(self):
+        response = kfc.OrderResponse(id="ext", status=kfc.OrderStatus.COOKED)
+
+        with (
+            mock.patch.object(kfc.Client, "aget_order", return_value=response),
+            mock.patch("food.services.DELIVERIES_QUEUE", "test:deliveries"),
+        ):
+            status = await poll_restaurant_order(self.job)
+
+        self.assertEqual(status, OrderStatus.COOKED)
+        tracking_order = await sync_to_async(get_tracking_order)(19)
+        self.assertEqual(tracking_order.restaurants["1"]["status"], OrderStatus.COOKED)
+
+
+class ProviderClientsTestCase(TestCase):
+    async def test_async_clients_of_the_loop_are_closed(self):
+        client = kfc.Client.async_client()
+
+        await close_provider_clients()
+
+        self.assertTrue(client.is_closed)
+        # the next request opens a new pool
+        self.assertIsNot(kfc.Client.async_client(), client)
+        await kfc.Client.aclose()
+
+
+class PollSchedulerTestCase(TestCase):
+    policy = ProviderPolicy(min_interval=0.01, max_interval=0.01, max_failures=3)
+
+    async def track(self, poll) -> TrackingError:
+        scheduler = PollScheduler(poll, {"silpo": self.policy})
+        try:
+            with self.assertRaises(TrackingError) as context:
+                await asyncio.wait_for(scheduler.track("silpo", "ext", 1, 1), 5)
+        finally:
+            scheduler.task.cancel()
+
+        return context.exception
+
+    async def test_budget_is_shared_by_the_processes(self):
+        self.addCleanup(CacheService().connection.delete, "polling:test:1000")
+
+        with mock.patch("food.scheduler.time.time", return_value=1000.5):
+            # e.g. two dispatchers polling at the same second
+            granted = [await take_budget("test", 2, rate_limit=3) for _ in range(3)]
+
+        self.assertEqual(granted, [2, 1, 0])
+
+    async def test_cancelled_order_is_given_up(self):
+        async def poll(job):
+            return OrderStatus.CANCELLED_BY_RESTAURANT
+
+        error = await self.track(poll)
+
+        self.assertEqual(error.status, OrderStatus.CANCELLED_BY_RESTAURANT)
+
+    async def test_failing_provider_is_given_up(self):
+        calls = 0
+
+        async def poll(job):
+            nonlocal calls
+            calls += 1
+            raise ValueError("unavailable")
+
+        error = await self.track(poll)
+
+        self.assertEqual(error.status, OrderStatus.FAILED)
+        self.assertEqual(calls, self.policy.max_failures)
+
+    async def test_order_is_given_up_after_timeout(self):
+        self.policy = ProviderPolicy(min_interval=0.01, max_interval=0.01, timeout=0.05)
+
+        async def poll(job):
+            return OrderStatus.COOKING
+
+        error = await self.track(poll)
+
+        self.assertEqual(error.status, OrderStatus.FAILED)
+
+
+@override_settings(WEBHOOK_SECRETS={"kfc": "secret"})
+class WebhookSignatureTestCase(TestCase):
+    body = json.dumps({"id": "unknown", "status": "cooked"}).encode()
+
+    def post(self, **headers):
+        return self.client.post(
+            "/webhooks/kfc",
+            self.body,
+            content_type="application/json",
+            headers=headers,
+        )
+
+    def test_unsigned_webhook_is_rejected(self):
+        self.assertEqual(self.post().status_code, 403)
+
+    def test_invalid_signature_is_rejected(self):
+        self.assertEqual(self.post(x_signature="0" * 64).status_code, 403)
+
+    def test_signed_webhook_is_accepted(self):
+        signature = hmac.new(b"secret", self.body, hashlib.sha256).hexdigest()
+
+        response = self.post(x_signature=signature)
+
+        # verified, but there is no such order in processing
+        self.assertEqual(response.status_code, 404)
+
+
+class RestaurantCacheTestCase(TestCase):
+    def test_renamed_restaurant_is_dropped_under_both_names(self):
+        restaurant = Restaurant.objects.create(name="Silpo", address="Kyiv")
+        cache = TieredCacheService()
+        for name in ("silpo", "silpo market"):
+            self.addCleanup(cache.delete, namespace="restaurants", key=name)
+        cache.set(namespace="restaurants", key="silpo", value={"id": restaurant.pk})
+
+        restaurant.name = "Silpo Market"
+        with self.captureOnCommitCallbacks(execute=True):
+            restaurant.save()
+
+        self.assertIsNone(cache.get(namespace="restaurants", key="silpo"))
+
+
+class DishesETagTestCase(TestCase):
+    def setUp(self):
+        self.addCleanup(
+            CacheService().connection.delete, MENU_SNAPSHOT_KEY, MENU_GENERATION_KEY
+        )
+        # the snapshot of another test is outdated
+        invalidate_menu_snapshot()
+
+        restaurant = Restaurant.objects.create(name="Silpo", address="Kyiv")
+        self.dish = Dish.objects.create(
+            name="Borscht", price=120, restaurant=restaurant
+        )
+        user = User.objects.create(email="menu@catering.com", phone_number="0994444401")
+        self.token = TokenObtainPairSerializer.get_token(user).access_token
+
+    def get(self, **headers):
+        return self.client.get(
+            "/food/dishes/",
+            headers={"authorization": f"Bearer {self.token}", **headers},
+        )
+
+    def test_not_modified_menu_is_not_sent_again(self):
+        response = self.get()
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()[0]["dishes"][0]["name"], "Borscht")
+        etag = response["ETag"]
+
+        with self.assertNumQueries(0):
+            response = self.get(if_none_match=etag)
+
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response.content, b"")
+        self.assertEqual(response["ETag"], etag)
+
+    def test_saved_dish_changes_the_etag(self):
+        etag = self.get()["ETag"]
+
+        self.dish.price = 150
+        with self.captureOnCommitCallbacks(execute=True):
+            self.dish.save()
+
+        response = self.get(if_none_match=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response["ETag"], etag)
+        self.assertEqual(response.json()[0]["dishes"][0]["price"], 150)
@@ -0,0 +1,169 @@
+"""
+Tracking orders are stored in Redis hashes, one field per value:
+
+    orders:17 {
+        restaurants:1:status: "cooking",
+        restaurants:1:external_id: "13",
+        restaurants:2:status: "not_started",
+        restaurants:2:external_id: "",
+        delivery: '{"provider": "uklon", "external_id": "..."}',
+        cooked: "1",    // set once, when all restaurants have cooked
+    }
+
+Every restaurant worker (or webhook) changes only its own fields, so
+concurrent updates never overwrite each other and nothing re-serializes
+the whole order.
+"""
+
+import json
+from dataclasses import dataclass, field
+
+from shared.cache import CacheService
+
+from .enums import OrderStatus
+
+TRACKING_ORDER_TTL = 60 * 60 * 24
+
+
+@dataclass
+class TrackingOrder:
+    """
+    {
+        17: {
+            restaurants: {
+                1: {  // internal restaurant id
+                    status: NOT_STARTED, // internal
+                    external_id: 13,
+                },
+                2: {  // internal restaurant id
+                    status: NOT_STARTED, // internal
+                    external_id: edf055b8-06e8-40ed-ab35-300fef3e0a5d,
+                },
+            },
+            delivery: {...}
+        },
+        18: ...
+    }
+    """
+
+    restaurants: dict = field(default_factory=dict)
+    delivery: dict = field(default_factory=dict)
+
+
+@dataclass
+class ExternalOrder:
+    """The internal order the provider's order belongs to."""
+
+    order_id: int
+    restaurant_id: int
+
+
+# KEYS[1] - tracking order
+# ARGV[1] - status field, ARGV[2] - new status, ARGV[3] - the "cooked" status
+# returns: -1 no such restaurant, 0 not changed, 1 changed, 2 changed & all cooked
+APPLY_STATUS_SCRIPT = """
+local current = redis.call('HGET', KEYS[1], ARGV[1])
+if not current then
+    return -1
+end
+if current == ARGV[2] or current == ARGV[3] then
+    return 0
+end
+redis.call('HSET', KEYS[1], ARGV[1], ARGV[2])
+
+local fields = redis.call('HGETALL', KEYS[1])
+for i = 1, #fields, 2 do
+    if string.sub(fields[i], -7) == ':status' and fields[i + 1] ~= ARGV[3] then
+        return 1
+    end
+end
+
+if redis.call('HSETNX', KEYS[1], 'cooked', 1) == 1 then
+    return 2
+end
+return 1
+"""
+
+STATUS_NOT_FOUND = -1
+STATUS_NOT_CHANGED = 0
+STATUS_CHANGED = 1
+STATUS_ALL_COOKED = 2
+
+
+def _key(order_id: int) -> str:
+    return CacheService._build_key("orders", str(order_id))
+
+
+def _field(restaurant_id: int, name: str) -> str:
+    return f"restaurants:{restaurant_id}:{name}"
+
+
+def create_tracking_order(
+    order_id: int, restaurant_ids: list[int], delivery_provider: str | None = None
+) -> None:
+    """Add restaurants to the tracking order, already known fields are kept."""
+
+    connection = CacheService().connection
+    key = _key(order_id)
+
+    with connection.pipeline(transaction=True) as pipe:
+        for restaurant_id in restaurant_ids:
+            pipe.hsetnx(key, _field(restaurant_id, "status"), OrderStatus.NOT_STARTED)
+            pipe.hsetnx(key, _field(restaurant_id, "external_id"), "")
+        pipe.hsetnx(key, "delivery", json.dumps({"provider": delivery_provider}))
+        pipe.expire(key, TRACKING_ORDER_TTL)
+        pipe.execute()
+
+
+def get_tracking_order(order_id: int) -> TrackingOrder | None:
+    payload: dict[bytes, bytes] = CacheService().connection.hgetall(  # type: ignore
+        _key(order_id)
+    )
+
+    if not payload:
+        return None
+
+    tracking_order = TrackingOrder()
+    for raw_name, raw_value in payload.items():
+        name, value = raw_name.decode(), raw_value.decode()
+
+        if name == "delivery":
+            tracking_order.delivery = json.loads(value)
+        elif name.startswith("restaurants:"):
+            _, restaurant_id, attribute = name.split(":")
+            restaurant = tracking_order.restaurants.setdefault(restaurant_id, {})
+            restaurant[attribute] = value or None
+
+    return tracking_order
+
+
+def set_external_id(
+    order_id: int, restaurant_id: int, external_id: str, cache: CacheService | None = None
+) -> None:
+    (cache or CacheService()).connection.hset(
+        _key(order_id), _field(restaurant_id, "external_id"), external_id
+    )
+
+
+def set_delivery(order_id: int, delivery: dict) -> None:
+    CacheService().connection.hset(_key(order_id), "delivery", json.dumps(delivery))
+
+
+def set_restaurant_status(
+    order_id: int, restaurant_id: int, status: OrderStatus
+) -> int:
+    """Atomically change the restaurant status and check if all are cooked.
+
+    A cooked restaurant order never goes back to the previous status and
+    `STATUS_ALL_COOKED` is returned only once per order.
+    """
+
+    connection = CacheService().connection
+    script = connection.register_script(APPLY_STATUS_SCRIPT)
+
+    return int(
+        script(
+            keys=[_key(order_id)],
+            args=[_field(restaurant_id, "status"), status, OrderStatus.COOKED],
+        )
+    )
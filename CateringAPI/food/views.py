@@ -1,24 +1,39 @@
-import csv
-import io
+import functools
+import json
 from datetime import date
 from typing import Any
 
-from django.db import transaction
+from asgiref.sync import sync_to_async
+
+from django.contrib import messages
+from django.contrib.admin.views.decorators import staff_member_required
+from django.core.handlers.asgi import ASGIRequest
+from django.db.models import Prefetch, QuerySet
+from django.http import HttpRequest, HttpResponse, JsonResponse, StreamingHttpResponse
 from django.shortcuts import redirect
-from django.utils.decorators import method_decorator
-from django.views.decorators.cache import cache_page
+from django.views.decorators.csrf import csrf_exempt
+from django.views.decorators.http import require_GET, require_http_methods
 from rest_framework import permissions, routers, serializers, viewsets
 from rest_framework.decorators import action
 from rest_framework.exceptions import ValidationError
-from rest_framework.pagination import LimitOffsetPagination, PageNumberPagination
+from rest_framework.pagination import (
+    BasePagination,
+    CursorPagination,
+    LimitOffsetPagination,
+    PageNumberPagination,
+)
 from rest_framework.request import Request
 from rest_framework.response import Response
 
-from users.models import Role, User
+from users.authentication import authenticate_request
+from users.models import Role
 
+from . import exporters, importers
 from .enums import DeliveryProvider
+from .events import stream_order_events
+from .menu import aget_menu_snapshot
 from .models import Dish, Order, OrderItem, OrderStatus, Restaurant
-from .services import schedule_order
+from .services import DELIVERY_PROVIDERS, create_order, schedule_order
 
 
 class DishSerializer(serializers.ModelSerializer):
@@ -35,8 +50,22 @@ class RestaurantSerializer(serializers.ModelSerializer):
         fields = "__all__"
 
 
+class DishPrimaryKeyField(serializers.PrimaryKeyRelatedField):
+    """Validate only the ID, dishes of all items are fetched at once
+    in the `OrderSerializer.validate_items`."""
+
+    def to_internal_value(self, data):
+        if isinstance(data, bool):
+            self.fail("incorrect_type", data_type=type(data).__name__)
+
+        try:
+            return int(data)
+        except (TypeError, ValueError):
+            self.fail("incorrect_type", data_type=type(data).__name__)
+
+
 class OrderItemSerializer(serializers.Serializer):
-    dish = serializers.PrimaryKeyRelatedField(queryset=Dish.objects.all())
+    dish = DishPrimaryKeyField(queryset=Dish.objects.all())
     quantity = serializers.IntegerField(min_value=1, max_value=20)
 
 
@@ -46,7 +75,7 @@ class OrderSerializer(serializers.Serializer):
     eta = serializers.DateField()
     total = serializers.IntegerField(min_value=1, read_only=True)
     status = serializers.ChoiceField(OrderStatus.choices(), read_only=True)
-    delivery_provider = serializers.CharField()
+    delivery_provider = serializers.ChoiceField(sorted(DELIVERY_PROVIDERS))
 
     @property
     def calculated_total(self) -> int:
@@ -60,8 +89,16 @@ class OrderSerializer(serializers.Serializer):
         return total
 
     # validate_<any-fieldname>
-    # def validate_items(self, value: date):
-    #     raise ValidationError("Some error")
+    def validate_items(self, value: list[dict]):
+        """Replace dishes IDs with instances using a single query."""
+
+        dishes: dict[int, Dish] = Dish.objects.in_bulk({item["dish"] for item in value})
+
+        missing = {item["dish"] for item in value} - dishes.keys()
+        if missing:
+            raise ValidationError(f"Dishes {sorted(missing)} do not exist.")
+
+        return [item | {"dish": dishes[item["dish"]]} for item in value]
 
     def validate_eta(self, value: date):
         if (value - date.today()).days < 1:
@@ -76,10 +113,8 @@ class KFCOrderSerializer(serializers.Serializer):
 
 class IsAdmin(permissions.BasePermission):
     def has_permission(self, request, view):
-        assert type(request.user) == User
-        user: User = request.user
-
-        if user.role == Role.ADMIN:
+        # `User` or `TokenUser` built from the access token claims
+        if getattr(request.user, "role", None) == Role.ADMIN:
             return True
         else:
             return False
@@ -129,6 +164,18 @@ class BaseFitlers:
 
 
 class FoodFilters(BaseFitlers):
+    delivery_provider: DeliveryProvider | None = None
+    status: OrderStatus | None = None
+
+    def extract_status(self, status: str | None = None) -> OrderStatus | None:
+        if status is None:
+            return None
+        else:
+            try:
+                return OrderStatus(status.lower())
+            except ValueError:
+                raise ValidationError(f"Status {status} is not supported")
+
     def extract_delivery_provider(
         self, provider: str | None = None
     ) -> DeliveryProvider | None:
@@ -144,92 +191,121 @@ class FoodFilters(BaseFitlers):
                 return _provider
 
 
+class OrdersCursorPagination(CursorPagination):
+    """Keyset pagination: every page is `WHERE id < :cursor LIMIT :size`.
+
+    GET /food/orders/?limit=50
+    GET /food/orders/?cursor=cD0xMjM0&status=cooking
+    """
+
+    ordering = "-id"
+    page_size = 50
+    page_size_query_param = "limit"
+    max_page_size = 500
+
+
+# the other query params (pagination, `format`, ...) are not filters
+ORDERS_FILTER_PARAMS = {"status", "deliveryProvider", "delivery_provider"}
+
+
 class FoodAPIViewSet(viewsets.GenericViewSet):
     def get_permissions(self):
         match self.action:
-            case "all_orders":
+            case "all_orders" | "export":
                 return [permissions.IsAuthenticated(), IsAdmin()]
             case _:
                 return [permissions.IsAuthenticated()]
 
-    @method_decorator(cache_page(100))
-    @action(methods=["get"], detail=False)
-    def dishes(self, request: Request) -> Response:
-        restaurants = Restaurant.objects.all()
-        serializer = RestaurantSerializer(restaurants, many=True)
-        # import time
-        # time.sleep(3)
-        return Response(data=serializer.data)
-
-    # HTTP GET /food/orders/4
-    @action(methods=["get"], detail=False, url_path=r"orders/(?P<id>\d+)")
-    def retrieve_order(self, request: Request, id: int) -> Response:
-        order = Order.objects.get(id=id)
-        serializer = OrderSerializer(order)
-        return Response(data=serializer.data)
-
-    # HTTP POST /food/orders/
-    def create_order(self, request: Request) -> Response:
-        serializer = OrderSerializer(data=request.data)
-        serializer.is_valid(raise_exception=True)
-
-        assert type(request.user) is User
-
-        with transaction.atomic():
-            order = Order.objects.create(
-                status=OrderStatus.NOT_STARTED,
-                user=request.user,
-                delivery_provider="uklon",
-                eta=serializer.validated_data["eta"],
-                total=serializer.calculated_total,
+    # HTTP GET /food/orders/ (admins), served by the async `orders` view
+    def all_orders(self, request: Request) -> Response:
+        filters = FoodFilters(
+            **{
+                key: value
+                for key, value in request.query_params.items()
+                if key in ORDERS_FILTER_PARAMS
+            }
+        )
+
+        # only the serialized columns, all items with one more query
+        # (dishes are serialized as IDs, so `dish_id` is enough)
+        orders = Order.objects.only(
+            "id", "eta", "total", "status", "delivery_provider"
+        ).prefetch_related(
+            Prefetch(
+                "items",
+                queryset=OrderItem.objects.only(
+                    "id", "order_id", "dish_id", "quantity"
+                ),
             )
+        )
+
+        if filters.delivery_provider is not None:
+            orders = orders.filter(delivery_provider=filters.delivery_provider)
+        if filters.status is not None:
+            orders = orders.filter(status=filters.status)
+
+        # `?offset=` is kept for old clients, deep offsets are full scans
+        paginator: BasePagination
+        if "offset" in request.query_params:
+            paginator = LimitOffsetPagination()
+            orders = orders.order_by("-id")
+        else:
+            paginator = OrdersCursorPagination()
 
-            items = serializer.validated_data["items"]
-            for dish_order in items:
-                instance = OrderItem.objects.create(
-                    dish=dish_order["dish"],
-                    quantity=dish_order["quantity"],
-                    order=order,
+        page = paginator.paginate_queryset(orders, request, view=self)
+        serializer = OrderSerializer(page, many=True)
+        return paginator.get_paginated_response(serializer.data)
+
+    # HTTP GET /food/export/orders/?output=ndjson&from=2025-05-01&to=2025-05-31
+    @action(
+        methods=["get"],
+        detail=False,
+        url_path=r"export/(?P<resource>restaurants|dishes|orders)",
+    )
+    def export(self, request: Request, resource: str) -> StreamingHttpResponse:
+        """Stream all rows, `?output=csv|ndjson` (`?format` belongs to DRF)."""
+
+        output: str = request.query_params.get("output", exporters.EXPORT_CSV)
+        if output not in exporters.EXPORT_CONTENT_TYPES:
+            raise ValidationError({"output": f"Output {output} is not supported"})
+
+        match resource:
+            case "restaurants":
+                content = exporters.export_restaurants(output)
+            case "dishes":
+                content = exporters.export_dishes(output)
+            case _:
+                content = exporters.export_orders(
+                    output,
+                    eta_from=self._query_date(request, "from"),
+                    eta_to=self._query_date(request, "to"),
                 )
-                print(f"New Dish Order Item is created: {instance.pk}")
 
-        print(f"New Food Order is created: {order.pk}. ETA: {order.eta}")
-
-        schedule_order(order)
-
-        return Response(OrderSerializer(order).data, status=201)
-
-    def all_orders(self, request: Request) -> Response:
-        # filters = FoodFilters(**request.query_params.dict())
-        # status: str | None = request.query_params.get("status")
-        # orders = (
-        #     Order.objects.all()
-        #     if filters.delivery_provider is None
-        #     else Order.objects.filter(delivery_provider=filters.delivery_provider)
-        # )
-
-        orders = Order.objects.all()
-
-        paginator = LimitOffsetPagination()
-        # paginator.page_size = 2
-        # paginator.page_size_query_param = "size"
-        page = paginator.paginate_queryset(orders, request, view=self)
+        # under ASGI a sync iterator would be read to the end before sending
+        if isinstance(request._request, ASGIRequest):
+            content = exporters.aiterate(content)
 
-        if page is not None:
-            serializer = OrderSerializer(page, many=True)
-            return paginator.get_paginated_response(serializer.data)
+        return StreamingHttpResponse(
+            content,
+            content_type=exporters.EXPORT_CONTENT_TYPES[output],
+            headers={
+                "Content-Disposition": f'attachment; filename="{resource}.{output}"'
+            },
+        )
 
-        serializer = OrderSerializer(orders, many=True)
-        return Response(serializer.data)
+    @staticmethod
+    def _query_date(request: Request, name: str) -> date | None:
+        value: str | None = request.query_params.get(name)
+        if value is None:
+            return None
 
-    @action(methods=["get", "post"], detail=False, url_path=r"orders")
-    def orders(self, request: Request) -> Response:
-        if request.method == "POST":
-            return self.create_order(request)
-        else:
-            return self.all_orders(request)
+        try:
+            return date.fromisoformat(value)
+        except ValueError:
+            raise ValidationError({name: f"Date {value} is not in YYYY-MM-DD format"})
 
 
+@staff_member_required
 def import_dishes(request):
     if request.method != "POST":
         raise ValueError(f"Method {request.method} is not allowed on this resource")
@@ -238,25 +314,159 @@ def import_dishes(request):
     if csv_file is None:
         raise ValueError("No CSV File Provided")
 
-    decoded = csv_file.read().decode("utf-8")
-    reader = csv.DictReader(io.StringIO(decoded))
-    total = 0
+    # large uploads are already in a temporary file, the rows are streamed from it
+    report = importers.import_dishes(csv_file.file)
+    print(f"{report.created} dishes uploaded to the database")
+
+    messages.info(
+        request, f"{report.created} dishes imported, {report.failed} rows failed"
+    )
+    for line, error in report.errors:
+        messages.warning(request, f"Line {line}: {error}")
+
+    return redirect(request.META.get("HTTP_REFERER", "/"))
+
+
+# The customer endpoints are plain async views: under the ASGI server
+# (`config/asgi.py`) a request waiting for the database or Redis doesn't
+# hold a worker thread. DRF views are sync only, so the admin endpoints
+# stay in `FoodAPIViewSet`.
+
+
+def jwt_required(view=None, *, allow_query_token: bool = False):
+    """`request.user` of the async view is built from the access token.
+
+    `401` without a valid token, DRF validation errors are `400` like in
+    DRF views. There are no cookies, so there is no CSRF check.
+    `allow_query_token` accepts `?token=` too, for `EventSource` only.
+    """
+
+    if view is None:
+        return functools.partial(jwt_required, allow_query_token=allow_query_token)
+
+    @csrf_exempt
+    @functools.wraps(view)
+    async def wrapper(request: HttpRequest, *args, **kwargs) -> HttpResponse:
+        user = authenticate_request(request, allow_query_token=allow_query_token)
+        if user is None:
+            return JsonResponse(
+                {"detail": "Authentication credentials were not provided."},
+                status=401,
+            )
+
+        request.user = user  # type: ignore[assignment]
 
-    for row in reader:
-        restaurant_name = row["restaurant"]
         try:
-            rest = Restaurant.objects.get(name__icontains=restaurant_name.lower())
-        except Restaurant.DoesNotExist:
-            print(f"Skipping restaurant {restaurant_name}")
-        else:
-            print(f"Restaurant {rest} found")
+            return await view(request, *args, **kwargs)
+        except ValidationError as error:
+            return JsonResponse(error.detail, status=400, safe=False)
 
-        Dish.objects.create(name=row["name"], price=int(row["price"]), restaurant=rest)
-        total += 1
+    return wrapper
 
-    print(f"{total} dishes uploaded to the database")
 
-    return redirect(request.META.get("HTTP_REFERER", "/"))
+def user_orders(user) -> QuerySet[Order]:
+    """All orders for admins, only own orders for everyone else."""
+
+    if user.role == Role.ADMIN:
+        return Order.objects.all()
+
+    return Order.objects.filter(user_id=user.id)
+
+
+# HTTP GET /food/dishes/
+@require_GET
+@jwt_required
+async def dishes(request: HttpRequest) -> HttpResponse:
+    """The pre-built menu snapshot, `304` if the client has the same version."""
+
+    snapshot = await aget_menu_snapshot()
+    headers = {"ETag": snapshot.etag, "Cache-Control": "private, no-cache"}
+
+    if snapshot.etag in request.headers.get("If-None-Match", ""):
+        return HttpResponse(status=304, headers=headers)
+
+    return HttpResponse(
+        snapshot.content, content_type="application/json", headers=headers
+    )
+
+
+# HTTP GET /food/orders/4/
+@require_GET
+@jwt_required
+async def retrieve_order(request: HttpRequest, id: int) -> HttpResponse:
+    orders = user_orders(request.user).filter(id=id).prefetch_related("items")
+
+    order = await orders.afirst()
+    if order is None:
+        return JsonResponse({"detail": "Not found."}, status=404)
+
+    return JsonResponse(OrderSerializer(order).data)
+
+
+def place_order(user_id: int, data: dict) -> dict:
+    """Validate, save and schedule the order, returns the created order.
+
+    Django has no async transactions, so this runs in a thread as a whole.
+    """
+
+    serializer = OrderSerializer(data=data)
+    serializer.is_valid(raise_exception=True)
+
+    order = create_order(
+        user_id=user_id,
+        eta=serializer.validated_data["eta"],
+        items=serializer.validated_data["items"],
+        total=serializer.calculated_total,
+        delivery_provider=serializer.validated_data["delivery_provider"],
+    )
+    print(f"New Food Order is created: {order.pk}. ETA: {order.eta}")
+
+    schedule_order(order)
+
+    return OrderSerializer(order).data
+
+
+@jwt_required
+async def create_order_view(request: HttpRequest) -> HttpResponse:
+    try:
+        data = json.loads(request.body)
+    except ValueError as error:
+        return JsonResponse({"detail": f"JSON parse error - {error}"}, status=400)
+
+    order = await sync_to_async(place_order)(request.user.id, data)
+
+    return JsonResponse(order, status=201)
+
+
+# the cursor pagination of DRF is sync only
+all_orders = FoodAPIViewSet.as_view({"get": "all_orders"})
+
+
+# HTTP GET /food/orders/ (admins) & POST /food/orders/
+@csrf_exempt
+@require_http_methods(["GET", "POST"])
+async def orders(request: HttpRequest) -> HttpResponse:
+    if request.method == "POST":
+        return await create_order_view(request)
+
+    return await sync_to_async(all_orders)(request)
+
+
+# HTTP GET /food/orders/4/events?token=<access token>
+@jwt_required(allow_query_token=True)
+async def order_events(request: HttpRequest, id: int) -> HttpResponse:
+    """Stream the order status changes with Server-Sent Events."""
+
+    status = user_orders(request.user).filter(id=id).values_list("status", flat=True)
+    if await status.afirst() is None:
+        return JsonResponse({"detail": "Not found."}, status=404)
+
+    return StreamingHttpResponse(
+        stream_order_events(id, current_status=status.afirst),
+        content_type="text/event-stream",
+        # nginx must not buffer the stream
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
 
 
 router = routers.DefaultRouter()
@@ -271,4 +481,3 @@ router.register(prefix="", viewset=FoodAPIViewSet, basename="food")
 # GET /users/ID
 # PUT /users/ID
 # DELETE /users/ID
-
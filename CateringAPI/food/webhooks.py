@@ -0,0 +1,95 @@
+"""
+Webhooks of push-capable providers.
+
+    POST /webhooks/kfc  {"id": "<external order id>", "status": "cooked"}
+    X-Signature: <hex HMAC-SHA256 of the body with settings.WEBHOOK_SECRETS>
+
+The webhook applies the change to the tracking order in the cache and to
+the `Order` row. Providers that push status changes are polled only rarely,
+in case a webhook is lost (see `POLLING_POLICIES`).
+Unsigned requests are rejected, anyone can reach the endpoint.
+"""
+
+import hashlib
+import hmac
+
+from django.conf import settings
+from rest_framework import permissions, serializers
+from rest_framework.decorators import (
+    api_view,
+    authentication_classes,
+    permission_classes,
+)
+from rest_framework.exceptions import NotFound, PermissionDenied, ValidationError
+from rest_framework.request import Request
+from rest_framework.response import Response
+
+from shared.cache import CacheService
+
+from .mapper import RESTAURANT_EXTERNAL_TO_INTERNAL
+from .services import PUSH_PROVIDERS, apply_restaurant_status, find_external_order
+
+
+class WebhookSerializer(serializers.Serializer):
+    id = serializers.CharField(max_length=255)
+    status = serializers.CharField(max_length=50)
+
+
+def verify_signature(request: Request, provider: str) -> None:
+    secret: str = settings.WEBHOOK_SECRETS.get(provider, "")
+    if not secret:
+        raise PermissionDenied(f"No webhook secret for {provider}")
+
+    expected = hmac.new(secret.encode(), request.body, hashlib.sha256).hexdigest()
+    signature = request.headers.get("X-Signature", "")
+    if not hmac.compare_digest(expected, signature):
+        raise PermissionDenied("Invalid webhook signature")
+
+
+@api_view(["POST"])
+@authentication_classes([])
+@permission_classes([permissions.AllowAny])
+def provider_webhook(request: Request, provider: str) -> Response:
+    if provider not in PUSH_PROVIDERS:
+        raise NotFound(f"Provider {provider} does not support webhooks")
+
+    # the raw body, before it is parsed
+    verify_signature(request, provider)
+
+    serializer = WebhookSerializer(data=request.data)
+    serializer.is_valid(raise_exception=True)
+    external_id: str = serializer.validated_data["id"]
+    external_status: str = serializer.validated_data["status"]
+
+    try:
+        status = RESTAURANT_EXTERNAL_TO_INTERNAL[provider][external_status]
+    except KeyError:
+        raise ValidationError({"status": f"Unknown status {external_status}"})
+
+    external_order = find_external_order(provider, external_id)
+    if external_order is None:
+        raise NotFound(f"No order {external_id} in processing")
+
+    # providers retry webhooks, so every event is applied only once
+    if not CacheService().add(
+        namespace="webhooks",
+        key=f"{provider}:{external_id}:{external_status}",
+        value={},
+        ttl=60 * 60,
+    ):
+        return Response(status=200)
+
+    try:
+        apply_restaurant_status(
+            order_id=external_order.order_id,
+            restaurant_id=external_order.restaurant_id,
+            status=status,
+        )
+    except Exception:
+        # let the provider retry the event
+        CacheService().delete(
+            namespace="webhooks", key=f"{provider}:{external_id}:{external_status}"
+        )
+        raise
+
+    return Response(status=202)
@@ -1,14 +1,97 @@
 """
 Structure:
-    set(key: str, value: dict)
-    get(key: str)
+    set(key: str, value: dict | Structure)
+    add(key: str, value: dict | Structure) -> bool
+    get(key: str, structure: type[Structure] | None)
+    pop(key: str, structure: type[Structure] | None)
     delete(key: str)
+    set_many(mapping: dict[str, dict | Structure])
+    get_many(keys: list[str], structure: type[Structure] | None)
+    pipeline()
+
+TieredCacheService adds an in-process LRU/TTL tier in front of Redis:
+    get_or_set(key: str, default: Callable[[], dict | Structure])
+
+Values are encoded with the codec from `settings.CACHE_CODEC`
+and compressed when larger than `settings.CACHE_COMPRESSION_THRESHOLD`.
 """
 
-import json
-from dataclasses import asdict, dataclass
+import asyncio
+import os
+import threading
+import time
+import uuid
+import weakref
+from collections import OrderedDict
+from contextlib import contextmanager
+from dataclasses import asdict, dataclass, is_dataclass
+from typing import Any, Callable, Iterator, TypeVar
+
 import redis
-from typing import Any
+import redis.asyncio
+from django.conf import settings
+
+from .codecs import Serializer
+from .metrics import count_redis_calls
+
+T = TypeVar("T")
+
+# one pool per process, all services share its connections
+_connection_pool: redis.ConnectionPool | None = None
+_connection_pool_lock = threading.Lock()
+
+
+def get_connection_pool() -> redis.ConnectionPool:
+    global _connection_pool
+
+    if _connection_pool is None:
+        with _connection_pool_lock:
+            if _connection_pool is None:
+                pool = redis.ConnectionPool.from_url(settings.CACHE_URL)
+                if settings.REQUEST_METRICS:
+                    count_redis_calls(pool)
+                _connection_pool = pool
+
+    return _connection_pool
+
+
+def get_connection() -> redis.Redis:
+    return redis.Redis(connection_pool=get_connection_pool())
+
+
+# `redis.asyncio.Redis` is bound to the event loop it was created in
+_async_connections: weakref.WeakKeyDictionary = weakref.WeakKeyDictionary()
+
+
+def get_async_connection() -> redis.asyncio.Redis:
+    """The Redis client of the running event loop, for async views."""
+
+    loop = asyncio.get_running_loop()
+
+    connection: redis.asyncio.Redis | None = _async_connections.get(loop)
+    if connection is None:
+        connection = redis.asyncio.Redis.from_url(settings.CACHE_URL)
+        if settings.REQUEST_METRICS:
+            count_redis_calls(connection.connection_pool)
+        _async_connections[loop] = connection
+
+    return connection
+
+
+_serializer: Serializer | None = None
+
+
+def get_serializer() -> Serializer:
+    global _serializer
+
+    if _serializer is None:
+        _serializer = Serializer(
+            codec=settings.CACHE_CODEC,
+            compression_threshold=settings.CACHE_COMPRESSION_THRESHOLD,
+        )
+
+    return _serializer
+
 
 @dataclass
 class Structure:
@@ -16,37 +99,278 @@ class Structure:
     name: str
 
 
-
 class CacheService:
     """
     set(namespace='user_activation', key='12', value=Activation(...))
-    get(namespace='user_activation', key='12') -> Activation(...)
+    get(namespace='user_activation', key='12', structure=Activation) -> Activation(...)
     """
 
-    def __init__(self):
-        self.connection: redis.Redis = redis.Redis.from_url(
-            "redis://localhost:6379/0"
-        )
+    def __init__(self, connection: redis.Redis | None = None):
+        self.connection: redis.Redis = connection or get_connection()
+        self.serializer: Serializer = get_serializer()
+
+    def _dumps(self, value: Any) -> bytes:
+        if is_dataclass(value) and not isinstance(value, type):
+            value = asdict(value)
+
+        return self.serializer.dumps(value)
+
+    def _loads(self, raw: bytes, structure: type[T] | None = None) -> T | Any:
+        value = self.serializer.loads(raw)
+
+        if structure is not None:
+            return structure(**value)
+
+        return value
 
     @staticmethod
     def _build_key(namespace: str, key: str) -> str:
         return f"{namespace}:{key}"
 
-    def set(self, namespace: str, key: str, value: dict, ttl: int | None = None):
-        # if not isinstance(value, Structure):
-        #     payload = asdict(value)
-
+    def set(self, namespace: str, key: str, value: Any, ttl: int | None = None):
         self.connection.set(
             name=self._build_key(namespace, key),
-            value=json.dumps(value),
-            ex=ttl
+            value=self._dumps(value),
+            ex=ttl,
         )
 
-    def get(self, namespace: str, key: str):
-        result: str = self.connection.get(  # type: ignore
+    def add(self, namespace: str, key: str, value: Any, ttl: int | None = None):
+        """Set the value only if the key does not exist yet.
+
+        Returns `True` if the value is saved.
+        """
+
+        return bool(
+            self.connection.set(
+                name=self._build_key(namespace, key),
+                value=self._dumps(value),
+                ex=ttl,
+                nx=True,
+            )
+        )
+
+    def get(self, namespace: str, key: str, structure: type[T] | None = None):
+        result: bytes | None = self.connection.get(  # type: ignore
+            self._build_key(namespace, key)
+        )
+
+        if result is None:
+            return None
+
+        return self._loads(result, structure)
+
+    def pop(self, namespace: str, key: str, structure: type[T] | None = None):
+        """Get and delete the value atomically (GETDEL), `None` if missing.
+
+        Only one of concurrent callers gets the value, e.g. one-time keys.
+        """
+
+        result: bytes | None = self.connection.getdel(  # type: ignore
             self._build_key(namespace, key)
         )
 
-        return json.loads(result)
+        if result is None:
+            return None
+
+        return self._loads(result, structure)
+
+    def delete(self, namespace: str, key: str):
+        self.connection.delete(self._build_key(namespace, key))
+
+    def set_many(self, namespace: str, mapping: dict[str, Any], ttl: int | None = None):
+        with self.pipeline() as batch:
+            for key, value in mapping.items():
+                batch.set(namespace=namespace, key=key, value=value, ttl=ttl)
+
+    def get_many(
+        self, namespace: str, keys: list[str], structure: type[T] | None = None
+    ) -> dict[str, Any]:
+        """Get all values with a single round trip, missing keys are skipped."""
+
+        if not keys:
+            return {}
+
+        results: list[bytes | None] = self.connection.mget(  # type: ignore
+            [self._build_key(namespace, key) for key in keys]
+        )
+
+        return {
+            key: self._loads(result, structure)
+            for key, result in zip(keys, results)
+            if result is not None
+        }
+
+    @contextmanager
+    def pipeline(self, transaction: bool = False) -> Iterator["CacheService"]:
+        """Send all writes in the block with a single round trip.
+
+        with cache.pipeline() as batch:
+            batch.set(namespace='orders', key='1', value={...})
+            batch.delete(namespace='orders', key='2')
+        """
+
+        with self.connection.pipeline(transaction=transaction) as pipe:
+            yield CacheService(connection=pipe)
+            pipe.execute()
+
+
+class LocalCache:
+    """Size-bounded in-process LRU cache with TTL, safe for threads."""
+
+    def __init__(self, max_size: int, ttl: float):
+        self.max_size = max_size
+        self.ttl = ttl
+        self._items: OrderedDict[str, tuple[float, bytes]] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> bytes | None:
+        with self._lock:
+            item = self._items.get(key)
+            if item is None:
+                return None
+
+            expires_at, value = item
+            if expires_at < time.monotonic():
+                del self._items[key]
+                return None
+
+            self._items.move_to_end(key)
+            return value
+
+    def set(self, key: str, value: bytes, ttl: float | None = None) -> None:
+        expires_at = time.monotonic() + min(ttl or self.ttl, self.ttl)
+
+        with self._lock:
+            self._items[key] = (expires_at, value)
+            self._items.move_to_end(key)
+
+            while len(self._items) > self.max_size:
+                self._items.popitem(last=False)
+
+    def delete(self, key: str) -> None:
+        with self._lock:
+            self._items.pop(key, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._items.clear()
+
+
+INVALIDATION_CHANNEL = "cache:invalidate"
+
+# unique id of the process, to skip own invalidation messages
+_origin: str = uuid.uuid4().hex
+_local_cache: LocalCache | None = None
+_local_cache_pid: int | None = None
+_local_cache_lock = threading.Lock()
+
+
+def _listen_invalidations(local_cache: LocalCache) -> None:
+    """Drop local values changed by other processes."""
+
+    while True:
+        try:
+            pubsub = get_connection().pubsub(ignore_subscribe_messages=True)
+            pubsub.subscribe(INVALIDATION_CHANNEL)
+
+            # the messages could be lost while reconnecting
+            local_cache.clear()
+
+            for message in pubsub.listen():
+                origin, _, key = message["data"].decode().partition(" ")
+                if origin != _origin:
+                    local_cache.delete(key)
+        except redis.ConnectionError:
+            local_cache.clear()
+            time.sleep(1)
+
+
+def get_local_cache() -> LocalCache:
+    global _local_cache, _local_cache_pid
+
+    # every (forked) process has its own local cache and listener
+    if _local_cache is None or _local_cache_pid != os.getpid():
+        with _local_cache_lock:
+            if _local_cache is None or _local_cache_pid != os.getpid():
+                local_cache = LocalCache(
+                    max_size=settings.LOCAL_CACHE_MAX_SIZE,
+                    ttl=settings.LOCAL_CACHE_TTL,
+                )
+                threading.Thread(
+                    target=_listen_invalidations, args=(local_cache,), daemon=True
+                ).start()
+                _local_cache, _local_cache_pid = local_cache, os.getpid()
+
+    return _local_cache
+
+
+class TieredCacheService(CacheService):
+    """
+    In-process cache in front of Redis for hot reads.
+
+    get(namespace='restaurants', key='silpo')     # local -> Redis
+    set(namespace='restaurants', key='silpo', value={...})
+    delete(namespace='restaurants', key='silpo')  # all processes drop the value
+
+    Local values live at most `settings.LOCAL_CACHE_TTL` seconds and are
+    invalidated in every process via Redis pub/sub when changed.
+    """
+
+    def __init__(self, connection: redis.Redis | None = None):
+        super().__init__(connection=connection)
+        self.local: LocalCache = get_local_cache()
+
+    def _invalidate(self, name: str) -> None:
+        self.local.delete(name)
+        self.connection.publish(INVALIDATION_CHANNEL, f"{_origin} {name}")
+
+    def set(self, namespace: str, key: str, value: Any, ttl: int | None = None):
+        name = self._build_key(namespace, key)
+        raw = self._dumps(value)
+
+        self.connection.set(name=name, value=raw, ex=ttl)
+        self._invalidate(name)
+        self.local.set(name, raw, ttl=ttl)
+
+    def get(self, namespace: str, key: str, structure: type[T] | None = None):
+        name = self._build_key(namespace, key)
+
+        raw: bytes | None = self.local.get(name)
+        if raw is None:
+            raw = self.connection.get(name)  # type: ignore
+            if raw is None:
+                return None
+            self.local.set(name, raw)
+
+        return self._loads(raw, structure)
+
+    def pop(self, namespace: str, key: str, structure: type[T] | None = None):
+        value = super().pop(namespace=namespace, key=key, structure=structure)
+        self._invalidate(self._build_key(namespace, key))
+
+        return value
+
+    def delete(self, namespace: str, key: str):
+        name = self._build_key(namespace, key)
+
+        self.connection.delete(name)
+        self._invalidate(name)
+
+    def get_or_set(
+        self,
+        namespace: str,
+        key: str,
+        default: Callable[[], Any],
+        structure: type[T] | None = None,
+        ttl: int | None = None,
+    ):
+        """Get the value or save the result of `default()` if there is no value."""
+
+        value = self.get(namespace, key, structure)
+        if value is None:
+            value = default()
+            self.set(namespace, key, value, ttl=ttl)
+            if structure is not None and not isinstance(value, structure):
+                value = structure(**value)
 
-    def delete(self, namespace: str, key: str): ...
+        return value
@@ -0,0 +1,163 @@
+"""
+Serialization of cache values.
+
+Every value is prefixed with a single header byte:
+
+    [ compressed flag (0x80) | codec id ] + payload
+
+so values written by any codec (or compressed ones) are always decoded
+correctly, and old plain JSON values (no header) are still readable.
+
+Codecs:
+    json     stdlib, always available
+    orjson   `pip install orjson`
+    msgpack  `pip install msgpack`
+
+Compression (zstd) requires `pip install zstandard`.
+"""
+
+import dataclasses
+import enum
+import json
+import uuid
+from datetime import date, datetime
+from typing import Any
+
+from django.core.exceptions import ImproperlyConfigured
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover
+    orjson = None
+
+try:
+    import msgpack
+except ImportError:  # pragma: no cover
+    msgpack = None
+
+try:
+    import zstandard
+except ImportError:  # pragma: no cover
+    zstandard = None
+
+
+COMPRESSED_FLAG = 0x80
+
+
+def _default(value: Any) -> Any:
+    """Convert values that are not supported by codecs natively."""
+
+    if dataclasses.is_dataclass(value) and not isinstance(value, type):
+        return dataclasses.asdict(value)
+    elif isinstance(value, enum.Enum):
+        return value.value
+    elif isinstance(value, (uuid.UUID, date, datetime)):
+        return str(value)
+    else:
+        raise TypeError(f"Type {type(value).__name__} is not serializable")
+
+
+class Codec:
+    id: int
+    name: str
+
+    def dumps(self, value: Any) -> bytes:
+        raise NotImplementedError
+
+    def loads(self, payload: bytes) -> Any:
+        raise NotImplementedError
+
+
+class JSONCodec(Codec):
+    id = 0x01
+    name = "json"
+
+    def dumps(self, value: Any) -> bytes:
+        return json.dumps(value, default=_default, separators=(",", ":")).encode()
+
+    def loads(self, payload: bytes) -> Any:
+        return json.loads(payload)
+
+
+class OrjsonCodec(Codec):
+    id = 0x02
+    name = "orjson"
+
+    def dumps(self, value: Any) -> bytes:
+        return orjson.dumps(value, default=_default)
+
+    def loads(self, payload: bytes) -> Any:
+        return orjson.loads(payload)
+
+
+class MsgpackCodec(Codec):
+    id = 0x03
+    name = "msgpack"
+
+    def dumps(self, value: Any) -> bytes:
+        return msgpack.packb(value, default=_default)
+
+    def loads(self, payload: bytes) -> Any:
+        return msgpack.unpackb(payload)
+
+
+# all codecs ever used for cache values, installed or not
+KNOWN_CODEC_IDS = {JSONCodec.id, OrjsonCodec.id, MsgpackCodec.id}
+
+CODECS: dict[str, Codec] = {"json": JSONCodec()}
+if orjson is not None:
+    CODECS["orjson"] = OrjsonCodec()
+if msgpack is not None:
+    CODECS["msgpack"] = MsgpackCodec()
+
+CODECS_BY_ID: dict[int, Codec] = {codec.id: codec for codec in CODECS.values()}
+
+
+class Serializer:
+    """Encode values with the codec and compress the large ones.
+
+    serializer = Serializer(codec="msgpack", compression_threshold=1024)
+    serializer.loads(serializer.dumps({"id": 1})) -> {"id": 1}
+    """
+
+    def __init__(self, codec: str = "json", compression_threshold: int | None = None):
+        if codec not in CODECS:
+            raise ImproperlyConfigured(f"Cache codec {codec} is not installed")
+        if compression_threshold is not None and zstandard is None:
+            raise ImproperlyConfigured("Cache compression requires `zstandard`")
+
+        self.codec: Codec = CODECS[codec]
+        self.compression_threshold = compression_threshold
+
+    def dumps(self, value: Any) -> bytes:
+        payload = self.codec.dumps(value)
+        header = self.codec.id
+
+        if (
+            self.compression_threshold is not None
+            and len(payload) > self.compression_threshold
+        ):
+            payload = zstandard.ZstdCompressor().compress(payload)
+            header |= COMPRESSED_FLAG
+
+        return bytes((header,)) + payload
+
+    def loads(self, raw: bytes) -> Any:
+        header = raw[0]
+        codec_id = header & ~COMPRESSED_FLAG
+
+        # value without a header, written before codecs were introduced
+        if codec_id not in KNOWN_CODEC_IDS:
+            return json.loads(raw)
+
+        codec = CODECS_BY_ID.get(codec_id)
+        if codec is None:
+            raise ImproperlyConfigured(f"Cache codec #{codec_id} is not installed")
+
+        payload = raw[1:]
+        if header & COMPRESSED_FLAG:
+            if zstandard is None:
+                raise ImproperlyConfigured("Cache compression requires `zstandard`")
+            payload = zstandard.ZstdDecompressor().decompress(payload)
+
+        return codec.loads(payload)
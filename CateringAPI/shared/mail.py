@@ -0,0 +1,94 @@
+"""
+Outbound mail queue.
+
+Requests never talk to the SMTP server, they only push the mail to the
+queue (one Redis command):
+
+    send_mail_later(
+        subject="User Activation",
+        message="...",
+        recipient_list=["john@catering.com"],
+    )
+    send_mails_later([Mail(...), Mail(...)])  # one Redis command for all
+
+and the `dispatch_mail` worker sends them in batches over one SMTP
+connection. Failed mails are retried `MAIL_MAX_ATTEMPTS` times and then
+moved to the dead letter queue.
+
+Structure:
+    queue:mail       pending mails
+    queue:mail:dead  mails that failed all attempts
+"""
+
+from dataclasses import asdict, dataclass, field
+
+from django.conf import settings
+from django.core.mail import EmailMessage
+
+from .queue import QueueService
+
+MAIL_QUEUE = "mail"
+MAIL_DEAD_LETTER_QUEUE = "mail:dead"
+MAIL_MAX_ATTEMPTS = 5
+
+
+@dataclass
+class Mail:
+    subject: str
+    message: str
+    recipient_list: list[str]
+    from_email: str | None = None
+    attempts: int = 0
+    errors: list[str] = field(default_factory=list)
+
+    def to_email_message(self) -> EmailMessage:
+        return EmailMessage(
+            subject=self.subject,
+            body=self.message,
+            from_email=self.from_email or settings.DEFAULT_FROM_EMAIL,
+            to=self.recipient_list,
+        )
+
+
+def send_mail_later(
+    subject: str,
+    message: str,
+    recipient_list: list[str],
+    from_email: str | None = None,
+) -> None:
+    mail = Mail(
+        subject=subject,
+        message=message,
+        recipient_list=recipient_list,
+        from_email=from_email,
+    )
+    QueueService().push(name=MAIL_QUEUE, value=asdict(mail))
+
+
+def send_mails_later(mails: list[Mail]) -> None:
+    """Queue all mails with one Redis command."""
+
+    QueueService().push_many(name=MAIL_QUEUE, values=[asdict(mail) for mail in mails])
+
+
+def retry_mail(mail: Mail, error: Exception, queue: QueueService | None = None) -> bool:
+    """Put the failed mail back to the queue, `False` if it is dead."""
+
+    mail.attempts += 1
+    mail.errors.append(f"{type(error).__name__}: {error}")
+
+    alive = mail.attempts < MAIL_MAX_ATTEMPTS
+    (queue or QueueService()).push(
+        name=MAIL_QUEUE if alive else MAIL_DEAD_LETTER_QUEUE, value=asdict(mail)
+    )
+
+    return alive
+
+
+def mail_queue_stats() -> dict[str, int]:
+    queue = QueueService()
+
+    return {
+        "pending": queue.depth(MAIL_QUEUE),
+        "dead": queue.depth(MAIL_DEAD_LETTER_QUEUE),
+    }
@@ -0,0 +1,162 @@
+"""
+Per-request metrics for load tests, enabled with `DJANGO_REQUEST_METRICS=1`.
+
+Every response gets the headers:
+
+    X-DB-Queries: 2
+    X-Redis-Calls: 3      // round trips, a pipeline is one call
+    Server-Timing: app;dur=12.4, db;dur=3.1, redis;dur=0.8
+
+Counters live in context variables, so concurrent requests (threads or
+async tasks) never mix their numbers.
+"""
+
+import contextvars
+import time
+from dataclasses import dataclass
+
+import redis
+import redis.asyncio
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.db import connections
+from django.db.backends.signals import connection_created
+from django.http import HttpResponse
+
+
+@dataclass
+class RequestMetrics:
+    db_queries: int = 0
+    db_time: float = 0
+    redis_calls: int = 0
+    redis_time: float = 0
+
+
+_metrics: contextvars.ContextVar[RequestMetrics | None] = contextvars.ContextVar(
+    "request_metrics", default=None
+)
+
+
+class CountingConnectionMixin:
+    """Count round trips of the Redis connection for the current request."""
+
+    def send_packed_command(self, command, check_health=True):
+        metrics = _metrics.get()
+        if metrics is None:
+            return super().send_packed_command(command, check_health)  # type: ignore
+
+        started_at = time.perf_counter()
+        try:
+            return super().send_packed_command(command, check_health)  # type: ignore
+        finally:
+            metrics.redis_calls += 1
+            metrics.redis_time += time.perf_counter() - started_at
+
+
+class AsyncCountingConnectionMixin:
+    """`CountingConnectionMixin` for the `redis.asyncio` connections."""
+
+    async def send_packed_command(self, command, check_health=True):
+        metrics = _metrics.get()
+        if metrics is None:
+            return await super().send_packed_command(command, check_health)  # type: ignore
+
+        started_at = time.perf_counter()
+        try:
+            return await super().send_packed_command(command, check_health)  # type: ignore
+        finally:
+            metrics.redis_calls += 1
+            metrics.redis_time += time.perf_counter() - started_at
+
+
+def count_redis_calls(
+    pool: redis.ConnectionPool | redis.asyncio.ConnectionPool,
+) -> None:
+    """Make new connections of the pool count their round trips."""
+
+    mixin = (
+        AsyncCountingConnectionMixin
+        if isinstance(pool, redis.asyncio.ConnectionPool)
+        else CountingConnectionMixin
+    )
+
+    connection_class = pool.connection_class
+    if not issubclass(connection_class, mixin):
+        pool.connection_class = type(
+            f"Counting{connection_class.__name__}", (mixin, connection_class), {}
+        )
+
+
+def _count_query(execute, sql, params, many, context):
+    metrics = _metrics.get()
+    if metrics is None:
+        return execute(sql, params, many, context)
+
+    started_at = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        metrics.db_queries += 1
+        metrics.db_time += time.perf_counter() - started_at
+
+
+def _count_queries(connection, **kwargs) -> None:
+    if _count_query not in connection.execute_wrappers:
+        connection.execute_wrappers.append(_count_query)
+
+
+class RequestMetricsMiddleware:
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+        # async views query in `sync_to_async` threads, so every connection
+        # counts the queries of the request it is used by (the context)
+        connection_created.connect(_count_queries)
+        for connection in connections.all(initialized_only=True):
+            _count_queries(connection)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+
+        metrics = RequestMetrics()
+        token = _metrics.set(metrics)
+        started_at = time.perf_counter()
+
+        try:
+            response = self.get_response(request)
+        finally:
+            _metrics.reset(token)
+
+        return self.add_headers(response, metrics, started_at)
+
+    async def __acall__(self, request):
+        metrics = RequestMetrics()
+        token = _metrics.set(metrics)
+        started_at = time.perf_counter()
+
+        try:
+            response = await self.get_response(request)
+        finally:
+            _metrics.reset(token)
+
+        return self.add_headers(response, metrics, started_at)
+
+    @staticmethod
+    def add_headers(
+        response: HttpResponse, metrics: RequestMetrics, started_at: float
+    ) -> HttpResponse:
+        duration = time.perf_counter() - started_at
+        response["X-DB-Queries"] = str(metrics.db_queries)
+        response["X-Redis-Calls"] = str(metrics.redis_calls)
+        response["Server-Timing"] = (
+            f"app;dur={duration * 1000:.1f}, "
+            f"db;dur={metrics.db_time * 1000:.1f}, "
+            f"redis;dur={metrics.redis_time * 1000:.1f}"
+        )
+
+        return response
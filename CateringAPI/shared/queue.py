@@ -0,0 +1,119 @@
+"""
+Structure:
+    push(name: str, value: dict)
+    push_many(name: str, values: list[dict])
+    pop(name: str, consumer: str, timeout: int) -> Message | None
+    pop_many(name: str, consumer: str, count: int) -> list[Message]
+    ack(message: Message)
+    recover(name: str, consumer: str)
+"""
+
+import json
+from dataclasses import dataclass
+
+import redis
+
+from .cache import get_connection
+
+
+@dataclass
+class Message:
+    queue: str
+    consumer: str
+    raw: bytes
+
+    @property
+    def value(self) -> dict:
+        return json.loads(self.raw)
+
+
+class QueueService:
+    """Durable FIFO queue on top of Redis lists.
+
+    Every popped message is atomically moved to the consumer's `processing`
+    list and stays there until it is acknowledged, so a crashed worker does
+    not lose messages: they are returned to the queue with `recover()`.
+
+    push(name='orders', value={'order_id': 17})
+    pop(name='orders', consumer='worker-1') -> Message(...)
+    ack(message)
+    """
+
+    def __init__(self):
+        self.connection: redis.Redis = get_connection()
+
+    @staticmethod
+    def _build_key(name: str) -> str:
+        return f"queue:{name}"
+
+    @classmethod
+    def _build_processing_key(cls, name: str, consumer: str) -> str:
+        return f"{cls._build_key(name)}:processing:{consumer}"
+
+    def push(self, name: str, value: dict) -> None:
+        self.connection.lpush(self._build_key(name), json.dumps(value))
+
+    def push_many(self, name: str, values: list[dict]) -> None:
+        """Push all values with a single LPUSH, in the given order."""
+
+        if values:
+            self.connection.lpush(
+                self._build_key(name), *(json.dumps(value) for value in values)
+            )
+
+    def pop(self, name: str, consumer: str, timeout: int = 5) -> Message | None:
+        raw: bytes | None = self.connection.blmove(  # type: ignore
+            self._build_key(name),
+            self._build_processing_key(name, consumer),
+            timeout,
+            src="RIGHT",
+            dest="LEFT",
+        )
+
+        if raw is None:
+            return None
+
+        return Message(queue=name, consumer=consumer, raw=raw)
+
+    def pop_many(self, name: str, consumer: str, count: int) -> list[Message]:
+        """Take up to `count` messages without waiting, in one round trip."""
+
+        with self.connection.pipeline(transaction=False) as pipe:
+            for _ in range(count):
+                pipe.lmove(
+                    self._build_key(name),
+                    self._build_processing_key(name, consumer),
+                    src="RIGHT",
+                    dest="LEFT",
+                )
+            results: list[bytes | None] = pipe.execute()
+
+        return [
+            Message(queue=name, consumer=consumer, raw=raw)
+            for raw in results
+            if raw is not None
+        ]
+
+    def ack(self, message: Message) -> None:
+        self.connection.lrem(
+            self._build_processing_key(message.queue, message.consumer),
+            1,
+            message.raw,
+        )
+
+    def recover(self, name: str, consumer: str) -> int:
+        """Return unacknowledged messages of the consumer back to the queue."""
+
+        total = 0
+        while self.connection.lmove(
+            self._build_processing_key(name, consumer),
+            self._build_key(name),
+            src="RIGHT",
+            dest="RIGHT",
+        ):
+            total += 1
+
+        return total
+
+    def depth(self, name: str) -> int:
+        return self.connection.llen(self._build_key(name))  # type: ignore
@@ -0,0 +1,304 @@
+"""
+Order lifecycle load test.
+
+Every virtual user goes through:
+
+    POST /auth/token/ -> GET /food/dishes/ -> POST /food/orders/ -> GET /food/orders/<id>/
+
+and (with `--wait-cooked`) polls the order until the restaurants cook it.
+
+The API must run with `DJANGO_REQUEST_METRICS=1` to report DB queries and
+Redis calls per request; with `--redis-url` all Redis commands (API and
+workers) per order are reported too.
+
+    make loadtest USERS=50
+    python tests/load/run.py --users 50 --orders 5 --json report.json
+    python tests/load/run.py --users 50 --baseline report.json  # exit 1 on regression
+"""
+
+import argparse
+import asyncio
+import json
+import random
+import statistics
+import sys
+import time
+from dataclasses import dataclass, field
+from datetime import date, timedelta
+
+import httpx
+
+try:
+    import redis
+except ImportError:  # pragma: no cover
+    redis = None
+
+
+@dataclass
+class Sample:
+    duration: float
+    ok: bool
+    db_queries: int | None = None
+    redis_calls: int | None = None
+
+
+@dataclass
+class Stats:
+    samples: dict[str, list[Sample]] = field(default_factory=dict)
+
+    def add(
+        self, name: str, response: httpx.Response | None, duration: float, ok: bool
+    ):
+        headers = response.headers if response is not None else {}
+        self.samples.setdefault(name, []).append(
+            Sample(
+                duration=duration,
+                ok=ok,
+                db_queries=_int(headers.get("X-DB-Queries")),
+                redis_calls=_int(headers.get("X-Redis-Calls")),
+            )
+        )
+
+    def report(self, elapsed: float) -> dict[str, dict]:
+        results = {}
+
+        for name, samples in self.samples.items():
+            durations = sorted(sample.duration * 1000 for sample in samples)
+            queries = [s.db_queries for s in samples if s.db_queries is not None]
+            calls = [s.redis_calls for s in samples if s.redis_calls is not None]
+
+            results[name] = {
+                "requests": len(samples),
+                "errors": sum(not sample.ok for sample in samples),
+                "rps": len(samples) / elapsed,
+                "p50": _percentile(durations, 50),
+                "p95": _percentile(durations, 95),
+                "p99": _percentile(durations, 99),
+                "db_queries": statistics.fmean(queries) if queries else None,
+                "redis_calls": statistics.fmean(calls) if calls else None,
+            }
+
+        return results
+
+
+def _int(value: str | None) -> int | None:
+    return int(value) if value is not None else None
+
+
+def _percentile(values: list[float], percent: int) -> float:
+    if not values:
+        return 0
+    index = min(len(values) - 1, round(percent / 100 * (len(values) - 1)))
+    return values[index]
+
+
+async def request(
+    client: httpx.AsyncClient, stats: Stats, name: str, method: str, url: str, **kwargs
+) -> httpx.Response | None:
+    started_at = time.perf_counter()
+    response = None
+
+    try:
+        response = await client.request(method, url, **kwargs)
+    except httpx.HTTPError as error:
+        print(f"{name} failed: {error!r}", file=sys.stderr)
+
+    ok = response is not None and response.status_code < 400
+    stats.add(name, response, time.perf_counter() - started_at, ok)
+
+    return response
+
+
+async def user_session(
+    client: httpx.AsyncClient, stats: Stats, number: int, args: argparse.Namespace
+) -> int:
+    """Create `args.orders` orders, returns the number of created ones."""
+
+    response = await request(
+        client,
+        stats,
+        "token",
+        "POST",
+        "/auth/token/",
+        json={"email": f"load-{number}@catering.com", "password": args.password},
+    )
+    if response is None or response.status_code != 200:
+        return 0
+
+    headers = {"Authorization": f"Bearer {response.json()['access']}"}
+    etag: str | None = None
+    dishes: list[int] = []
+    created = 0
+
+    for _ in range(args.orders):
+        response = await request(
+            client,
+            stats,
+            "dishes",
+            "GET",
+            "/food/dishes/",
+            headers=headers | ({"If-None-Match": etag} if etag else {}),
+        )
+        if response is not None and response.status_code == 200:
+            etag = response.headers.get("ETag")
+            dishes = [
+                dish["id"]
+                for restaurant in response.json()
+                for dish in restaurant["dishes"]
+            ]
+        if not dishes:
+            return created
+
+        response = await request(
+            client,
+            stats,
+            "create_order",
+            "POST",
+            "/food/orders/",
+            headers=headers,
+            json={
+                "eta": str(date.today() + timedelta(days=2)),
+                "delivery_provider": "uklon",
+                "items": [
+                    {"dish": dish, "quantity": random.randint(1, 3)}
+                    for dish in random.sample(dishes, min(len(dishes), 3))
+                ],
+            },
+        )
+        if response is None or response.status_code != 201:
+            continue
+        created += 1
+        order_id = response.json()["id"]
+
+        deadline = time.monotonic() + args.cooked_timeout
+        while True:
+            response = await request(
+                client,
+                stats,
+                "retrieve_order",
+                "GET",
+                f"/food/orders/{order_id}/",
+                headers=headers,
+            )
+            if not args.wait_cooked or response is None or time.monotonic() > deadline:
+                break
+            if response.json().get("status") not in ("not_started", "cooking"):
+                break
+            await asyncio.sleep(1)
+
+    return created
+
+
+def redis_commands(url: str | None) -> int | None:
+    if url is None or redis is None:
+        return None
+
+    return redis.Redis.from_url(url).info("stats")["total_commands_processed"]
+
+
+def compare(report: dict, baseline_path: str, threshold: float) -> list[str]:
+    with open(baseline_path) as file:
+        baseline: dict = json.load(file)
+
+    regressions = []
+    for name, current in report["endpoints"].items():
+        previous = baseline["endpoints"].get(name)
+        if previous is None:
+            continue
+
+        if current["p95"] > previous["p95"] * (1 + threshold):
+            regressions.append(
+                f"{name}: p95 {previous['p95']:.1f} -> {current['p95']:.1f} ms"
+            )
+        for metric in ("db_queries", "redis_calls"):
+            if (current[metric] or 0) > (previous[metric] or 0) + 0.5:
+                regressions.append(
+                    f"{name}: {metric} {previous[metric]} -> {current[metric]}"
+                )
+
+    return regressions
+
+
+async def main(args: argparse.Namespace) -> int:
+    limits = httpx.Limits(
+        max_connections=args.users, max_keepalive_connections=args.users
+    )
+    commands_before = redis_commands(args.redis_url)
+    stats = Stats()
+
+    async with httpx.AsyncClient(
+        base_url=args.base_url, limits=limits, timeout=args.timeout
+    ) as client:
+        started_at = time.perf_counter()
+        created = await asyncio.gather(
+            *(user_session(client, stats, number, args) for number in range(args.users))
+        )
+        elapsed = time.perf_counter() - started_at
+
+    orders = sum(created)
+    commands_after = redis_commands(args.redis_url)
+    report = {
+        "users": args.users,
+        "orders": orders,
+        "elapsed": elapsed,
+        "orders_per_second": orders / elapsed,
+        "redis_commands_per_order": (
+            (commands_after - commands_before) / orders
+            if orders and commands_before is not None and commands_after is not None
+            else None
+        ),
+        "endpoints": stats.report(elapsed),
+    }
+
+    print(
+        f"{args.users} users, {orders} orders in {elapsed:.1f}s "
+        f"({report['orders_per_second']:.1f} orders/s)"
+    )
+    if report["redis_commands_per_order"] is not None:
+        print(f"Redis commands per order: {report['redis_commands_per_order']:.1f}")
+
+    print(
+        f"{'endpoint':<16}{'requests':>9}{'errors':>8}{'rps':>8}"
+        f"{'p50, ms':>9}{'p95, ms':>9}{'p99, ms':>9}{'db':>6}{'redis':>7}"
+    )
+    for name, row in report["endpoints"].items():
+        db = f"{row['db_queries']:.1f}" if row["db_queries"] is not None else "-"
+        calls = f"{row['redis_calls']:.1f}" if row["redis_calls"] is not None else "-"
+        print(
+            f"{name:<16}{row['requests']:>9}{row['errors']:>8}{row['rps']:>8.1f}"
+            f"{row['p50']:>9.1f}{row['p95']:>9.1f}{row['p99']:>9.1f}{db:>6}{calls:>7}"
+        )
+
+    if args.json:
+        with open(args.json, "w") as file:
+            json.dump(report, file, indent=2)
+
+    if args.baseline:
+        regressions = compare(report, args.baseline, args.threshold)
+        for regression in regressions:
+            print(f"REGRESSION {regression}", file=sys.stderr)
+        if regressions:
+            return 1
+
+    return 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--base-url", default="http://localhost:8000")
+    parser.add_argument("--users", type=int, default=10, help="concurrent users")
+    parser.add_argument("--orders", type=int, default=3, help="orders per user")
+    parser.add_argument("--password", default="Load-test-password-1")
+    parser.add_argument("--timeout", type=float, default=30)
+    parser.add_argument("--wait-cooked", action="store_true")
+    parser.add_argument("--cooked-timeout", type=float, default=60)
+    parser.add_argument(
+        "--redis-url", help="count all Redis commands, e.g. redis://localhost:6379/0"
+    )
+    parser.add_argument("--json", help="save the report to the file")
+    parser.add_argument("--baseline", help="the previous report to compare with")
+    parser.add_argument(
+        "--threshold", type=float, default=0.2, help="allowed p95 growth, 0.2 = 20%%"
+    )
+
+    sys.exit(asyncio.run(main(parser.parse_args())))
@@ -1,18 +1,39 @@
-import time
+import hashlib
+import hmac
+import json
+import os
 from typing import Literal
 import httpx
-import random
 import uuid
 
-from fastapi import FastAPI, BackgroundTasks
+from fastapi import FastAPI
 from pydantic import BaseModel
 
+from tests.providers.simulation import Simulation
+
 OrderStatus = Literal["not started", "cooking", "cooked", "finished"]
-STORAGE: dict[str, OrderStatus] = {}
-CATERING_API_WEBHOOK_URL = "http://localhost:8000/webhooks/kfc"
+CATERING_API_WEBHOOK_URL = os.getenv(
+    "CATERING_API_WEBHOOK_URL", "http://localhost:8000/webhooks/kfc"
+)
+# the same as the Catering API's one
+KFC_WEBHOOK_SECRET = os.getenv("KFC_WEBHOOK_SECRET", "")
 
 
 app = FastAPI()
+simulation = Simulation("KFC", app)
+STORAGE = simulation.storage
+
+# one pool for all webhooks, created in the server's event loop
+_webhooks_client: httpx.AsyncClient | None = None
+
+
+def webhooks_client() -> httpx.AsyncClient:
+    global _webhooks_client
+
+    if _webhooks_client is None:
+        _webhooks_client = httpx.AsyncClient(timeout=5)
+
+    return _webhooks_client
 
 
 class OrderItem(BaseModel):
@@ -27,27 +48,32 @@ class OrderRequestBody(BaseModel):
 async def update_order_status(order_id: str):
     ORDER_STATUSES: tuple[OrderStatus, ...] = ("cooking", "cooked", "finished")
     for status in ORDER_STATUSES:
-        time.sleep(random.randint(4, 6))
-        STORAGE[order_id] = status
+        await simulation.step()
+        STORAGE.update(order_id, status)
         print(f"KFC: [{order_id}] --> {status}")
 
-        if status == "finished":
-            async with httpx.AsyncClient() as client:
-                try:
-                    await client.post(
-                        CATERING_API_WEBHOOK_URL, data={"id": order_id, "status": status}
-                    )
-                except httpx.ConnectError as error:
-                    print("API connection failed")
-                else:
-                    print(f"KFC: {CATERING_API_WEBHOOK_URL} notified about {status}")
+        body = json.dumps({"id": order_id, "status": status}).encode()
+        signature = hmac.new(
+            KFC_WEBHOOK_SECRET.encode(), body, hashlib.sha256
+        ).hexdigest()
+
+        try:
+            await webhooks_client().post(
+                CATERING_API_WEBHOOK_URL,
+                content=body,
+                headers={"Content-Type": "application/json", "X-Signature": signature},
+            )
+        except httpx.HTTPError as error:
+            print(f"API connection failed: {error!r}")
+        else:
+            print(f"KFC: {CATERING_API_WEBHOOK_URL} notified about {status}")
 
 
 @app.post("/api/orders")
-async def make_order(body: OrderRequestBody, background_tasks: BackgroundTasks):
+async def make_order(body: OrderRequestBody):
     order_id = str(uuid.uuid4())
     STORAGE[order_id] = "not started"
-    background_tasks.add_task(update_order_status, order_id)
+    simulation.spawn(update_order_status(order_id))
 
     return {"id": order_id, "status": "not started"}
 
@@ -55,3 +81,7 @@ async def make_order(body: OrderRequestBody, background_tasks: BackgroundTasks):
 @app.get("/api/orders/{order_id}")
 async def get_order(order_id: str):
     return STORAGE.get(order_id, {"error": "Nu such order"})
+
+
+if __name__ == "__main__":
+    simulation.main("tests.providers.kfc:app", port=8002)
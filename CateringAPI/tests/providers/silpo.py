@@ -1,16 +1,18 @@
-import time
 from typing import Literal
-import asyncio
-import random
 import uuid
 
-from fastapi import FastAPI, BackgroundTasks
+from fastapi import FastAPI
 from pydantic import BaseModel
 
+from tests.providers.simulation import Simulation
+
 
 OrderStatus = Literal["not started", "cooking", "cooked", "finished"]
 
-STORAGE: dict[str, OrderStatus] = {}
+
+app = FastAPI()
+simulation = Simulation("SILPO", app)
+STORAGE = simulation.storage
 """
 {
     "fcc5ed76-ea30-46d8-83db-fb4b0bfbaa03": "not started"
@@ -18,9 +20,6 @@ STORAGE: dict[str, OrderStatus] = {}
 """
 
 
-app = FastAPI()
-
-
 class OrderItem(BaseModel):
     dish: str
     quantity: int
@@ -30,21 +29,21 @@ class OrderRequestBody(BaseModel):
     order: list[OrderItem]
 
 
-def update_order_status(order_id: str):
+async def update_order_status(order_id: str):
     ORDER_STATUSES: tuple[OrderStatus, ...] = ("cooking", "cooked", "finished")
     for status in ORDER_STATUSES:
-        time.sleep(random.randint(4, 6))
-        STORAGE[order_id] = status
+        await simulation.step()
+        STORAGE.update(order_id, status)
         print(f"SILPO: [{order_id}] --> {status}")
 
 
 @app.post("/api/orders")
-def make_order(body: OrderRequestBody, background_tasks: BackgroundTasks):
+async def make_order(body: OrderRequestBody):
     print(body)
 
     order_id = str(uuid.uuid4())
     STORAGE[order_id] = "not started"
-    background_tasks.add_task(update_order_status, order_id)
+    simulation.spawn(update_order_status(order_id))
 
     return {
         "id": order_id,
@@ -53,5 +52,9 @@ def make_order(body: OrderRequestBody, background_tasks: BackgroundTasks):
 
 
 @app.get("/api/orders/{order_id}")
-def get_order(order_id: str):
+async def get_order(order_id: str):
     return {"id": order_id, "status": STORAGE.get(order_id)}
+
+
+if __name__ == "__main__":
+    simulation.main("tests.providers.silpo:app", port=8001)
@@ -0,0 +1,224 @@
+"""
+Providers behaviour simulation for the mocks.
+
+Every mock reads its settings from the environment (with the provider
+prefix) or from the command line:
+
+    SILPO_STEP_LATENCY=uniform:4,6 uvicorn tests.providers.silpo:app
+    python -m tests.providers.silpo --port 8001 --error-rate 0.05 --rate-limit 20
+
+Settings:
+    response_latency  delay of every response, seconds (distribution)
+    step_latency      delay between the order status changes (distribution)
+    error_rate        share of requests answered with `500`
+    timeout_rate      share of requests that hang for `timeout` seconds
+    timeout           how long the hanging requests wait
+    rate_limit        requests per second, `429` over it (0 - unlimited)
+    max_orders        orders kept in memory, the oldest are dropped
+    order_ttl         seconds the order is kept in memory
+
+Distributions:
+    fixed:5  uniform:4,6  normal:5,1  lognormal:1.5,0.4  exponential:5
+"""
+
+import argparse
+import asyncio
+import math
+import os
+import random
+import time
+from collections import OrderedDict
+from dataclasses import dataclass, fields
+from typing import Any, Coroutine
+
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse
+
+
+class Distribution:
+    KINDS = {
+        "fixed": lambda value: value,
+        "uniform": random.uniform,
+        "normal": random.gauss,
+        "lognormal": random.lognormvariate,
+        "exponential": lambda mean: random.expovariate(1 / mean),
+    }
+
+    def __init__(self, spec: str):
+        kind, _, params = spec.partition(":")
+        if kind not in self.KINDS:
+            raise ValueError(
+                f"Unknown distribution {spec}, use {', '.join(self.KINDS)}"
+            )
+
+        self.spec = spec
+        self.kind = kind
+        self.params = [float(param) for param in params.split(",") if param]
+
+    def __repr__(self) -> str:
+        return self.spec
+
+    def sample(self) -> float:
+        return max(0.0, self.KINDS[self.kind](*self.params))
+
+
+@dataclass
+class SimulationConfig:
+    response_latency: Distribution = Distribution("fixed:0")
+    step_latency: Distribution = Distribution("uniform:4,6")
+    error_rate: float = 0
+    timeout_rate: float = 0
+    timeout: float = 30
+    rate_limit: float = 0
+    max_orders: int = 10_000
+    order_ttl: float = 60 * 60
+
+    @classmethod
+    def from_env(cls, prefix: str, **defaults) -> "SimulationConfig":
+        config = cls(**defaults)
+        for name, value in os.environ.items():
+            if name.startswith(f"{prefix}_"):
+                config.update(name.removeprefix(f"{prefix}_").lower(), value)
+
+        return config
+
+    def update(self, name: str, value: str) -> None:
+        types = {item.name: item.type for item in fields(self)}
+        if name not in types:
+            return
+
+        kind = types[name]
+        if kind in (Distribution, "Distribution"):
+            setattr(self, name, Distribution(value))
+        elif kind in (int, "int"):
+            setattr(self, name, int(value))
+        else:
+            setattr(self, name, float(value))
+
+
+class Storage:
+    """Orders kept in memory, bounded by the size and the age."""
+
+    def __init__(self, config: SimulationConfig):
+        self.config = config
+        self.items: OrderedDict[str, tuple[float, Any]] = OrderedDict()
+
+    def __setitem__(self, key: str, value: Any) -> None:
+        self.items[key] = (time.monotonic() + self.config.order_ttl, value)
+        self.items.move_to_end(key)
+        self.evict()
+
+    def get(self, key: str, default: Any = None) -> Any:
+        item = self.items.get(key)
+        if item is None or item[0] < time.monotonic():
+            return default
+
+        return item[1]
+
+    def update(self, key: str, value: Any) -> None:
+        """Change the order, if it is not dropped yet."""
+
+        if key in self.items:
+            expires_at, _ = self.items[key]
+            self.items[key] = (expires_at, value)
+
+    def evict(self) -> None:
+        now = time.monotonic()
+        while self.items:
+            key, (expires_at, _) = next(iter(self.items.items()))
+            if expires_at >= now and len(self.items) <= self.config.max_orders:
+                break
+            del self.items[key]
+
+    def __len__(self) -> int:
+        return len(self.items)
+
+
+class RateLimiter:
+    def __init__(self, config: SimulationConfig):
+        self.config = config
+        self.tokens = config.rate_limit
+        self.updated_at = time.monotonic()
+
+    def take(self) -> bool:
+        rate = self.config.rate_limit
+        if not rate:
+            return True
+
+        now = time.monotonic()
+        self.tokens = min(rate, self.tokens + (now - self.updated_at) * rate)
+        self.updated_at = now
+
+        if self.tokens < 1:
+            return False
+
+        self.tokens -= 1
+        return True
+
+
+class Simulation:
+    """
+    simulation = Simulation("SILPO", app)
+    simulation.storage[order_id] = "not started"
+    simulation.spawn(update_order_status(order_id))
+    """
+
+    def __init__(self, prefix: str, app: FastAPI, **defaults):
+        self.prefix = prefix
+        self.config = SimulationConfig.from_env(prefix, **defaults)
+        self.storage = Storage(self.config)
+        self.limiter = RateLimiter(self.config)
+        self.tasks: set[asyncio.Task] = set()
+
+        app.middleware("http")(self.middleware)
+
+    async def middleware(self, request: Request, call_next):
+        if not self.limiter.take():
+            return JSONResponse(
+                {"error": "Too many requests"},
+                status_code=429,
+                headers={"Retry-After": str(math.ceil(1 / self.config.rate_limit))},
+            )
+
+        chance = random.random()
+        if chance < self.config.timeout_rate:
+            await asyncio.sleep(self.config.timeout)
+            return JSONResponse({"error": "Timeout"}, status_code=504)
+        if chance < self.config.timeout_rate + self.config.error_rate:
+            return JSONResponse({"error": "Internal error"}, status_code=500)
+
+        await asyncio.sleep(self.config.response_latency.sample())
+
+        return await call_next(request)
+
+    async def step(self) -> None:
+        """Wait until the next order status change."""
+
+        await asyncio.sleep(self.config.step_latency.sample())
+
+    def spawn(self, coroutine: Coroutine) -> None:
+        """Run in the background, without blocking the response."""
+
+        task = asyncio.create_task(coroutine)
+        self.tasks.add(task)
+        task.add_done_callback(self.tasks.discard)
+
+    def main(self, app_path: str, port: int) -> None:
+        """Run the mock with the settings from the command line."""
+
+        import uvicorn
+
+        parser = argparse.ArgumentParser(description=f"{self.prefix} mock")
+        parser.add_argument("--host", default="0.0.0.0")
+        parser.add_argument("--port", type=int, default=port)
+        for item in fields(self.config):
+            parser.add_argument(f"--{item.name.replace('_', '-')}")
+
+        args = parser.parse_args()
+        for item in fields(self.config):
+            value = getattr(args, item.name)
+            if value is not None:
+                # the variables are read by the server process
+                os.environ[f"{self.prefix}_{item.name.upper()}"] = value
+
+        uvicorn.run(app_path, host=args.host, port=args.port)
@@ -2,14 +2,17 @@ import asyncio
 import random
 import uuid
 
-from fastapi import FastAPI, BackgroundTasks
+from fastapi import FastAPI
 from pydantic import BaseModel, Field
 
+from tests.providers.simulation import Distribution, Simulation
+
 
 ORDER_STATUSES = ("not started", "delivery", "delivered")
-STORAGE: dict[str, dict] = {}
 
 app = FastAPI()
+simulation = Simulation("UKLON", app, step_latency=Distribution("uniform:1,2"))
+STORAGE = simulation.storage
 
 
 class OrderRequestBody(BaseModel):
@@ -17,33 +20,39 @@ class OrderRequestBody(BaseModel):
     comments: list[str] = Field(min_length=1)
 
 
-async def delivery(order_id: str):
+async def delivery(order: dict):
     for _ in range(5):
-        STORAGE[order_id]["location"] = (random.random(), random.random())
+        order["location"] = (random.random(), random.random())
 
-    for address in STORAGE[order_id]["addresses"]:
+    for address in order["addresses"]:
         await asyncio.sleep(1)
         for _ in range(5):
-            STORAGE[order_id]["location"] = (random.random(), random.random())
+            order["location"] = (random.random(), random.random())
             await asyncio.sleep(0.5)
 
         print(f"🏁 Delivered to {address}")
 
 
 async def update_order_status(order_id):
+    # the same dict is kept in the storage, until the order expires
+    order: dict | None = STORAGE.get(order_id)
+    if order is None:
+        print(f"UKLON: [{order_id}] is not found")
+        return
+
     for status in ORDER_STATUSES[1:]:
-        STORAGE[order_id]["location"] = (random.random(), random.random())
-        await asyncio.sleep(random.randint(1, 2))
+        order["location"] = (random.random(), random.random())
+        await simulation.step()
 
         if status == "delivery":
-            await delivery(order_id)
+            await delivery(order)
 
-        STORAGE[order_id]["status"] = status
+        order["status"] = status
         print(f"UKLON: [{order_id}] --> {status}")
 
 
 @app.post("/drivers/orders")
-def make_order(body: OrderRequestBody, background_tasks: BackgroundTasks):
+async def make_order(body: OrderRequestBody):
     print(body)
     order_id = str(uuid.uuid4())
     STORAGE[order_id] = {
@@ -53,11 +62,15 @@ def make_order(body: OrderRequestBody, background_tasks: BackgroundTasks):
         "comments": body.comments,
         "location": (random.random(), random.random()),
     }
-    background_tasks.add_task(update_order_status, order_id)
+    simulation.spawn(update_order_status(order_id))
 
     return STORAGE.get(order_id, {"error": "No such order"})
 
 
 @app.get("/drivers/orders/{order_id}")
-def get_order(order_id: str):
+async def get_order(order_id: str):
     return STORAGE.get(order_id, {"error": "Nu such order"})
+
+
+if __name__ == "__main__":
+    simulation.main("tests.providers.uklon:app", port=8003)
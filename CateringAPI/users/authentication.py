@@ -0,0 +1,135 @@
+"""
+Stateless JWT authentication.
+
+The access token carries everything needed to authorize the request:
+
+    {"user_id": 3, "role": "admin", "is_active": true, ...}
+
+so `request.user` is built from the token claims without querying the
+`users` table. The claims are fixed when the token is issued: a changed
+role or a deactivated user takes effect after `ACCESS_TOKEN_LIFETIME`
+(minutes), when the refresh reads the current user record.
+
+The views that need the whole user record (e.g. the profile) use
+`get_user()`, which keeps records in a short-TTL in-process cache.
+"""
+
+from django.conf import settings
+from django.utils.functional import cached_property
+from rest_framework_simplejwt import models, serializers
+from rest_framework_simplejwt.authentication import JWTStatelessUserAuthentication
+from rest_framework_simplejwt.exceptions import AuthenticationFailed, InvalidToken
+from rest_framework_simplejwt.settings import api_settings
+
+from shared.cache import LocalCache, get_serializer
+
+from .models import User
+
+# the user fields that are cached, everything except the password
+USER_CACHE_FIELDS = (
+    "id",
+    "email",
+    "phone_number",
+    "first_name",
+    "last_name",
+    "role",
+    "is_active",
+    "is_staff",
+)
+
+_users = LocalCache(max_size=settings.LOCAL_CACHE_MAX_SIZE, ttl=settings.USER_CACHE_TTL)
+
+
+class TokenObtainPairSerializer(serializers.TokenObtainPairSerializer):
+    @classmethod
+    def get_token(cls, user: User):  # type: ignore[override]
+        token = super().get_token(user)
+        token["role"] = user.role
+        token["is_active"] = user.is_active
+
+        return token
+
+
+class TokenRefreshSerializer(serializers.TokenRefreshSerializer):
+    """The new access token has the current claims, not the ones of the login."""
+
+    def validate(self, attrs):
+        refresh = self.token_class(attrs["refresh"])
+
+        user = (
+            User.objects.only("role", "is_active")
+            .filter(id=refresh.payload.get(api_settings.USER_ID_CLAIM))
+            .first()
+        )
+        if user is None or not user.is_active:
+            raise AuthenticationFailed(
+                self.error_messages["no_active_account"], "no_active_account"
+            )
+
+        access = refresh.access_token
+        access["role"] = user.role
+        access["is_active"] = user.is_active
+
+        return {"access": str(access)}
+
+
+class TokenUser(models.TokenUser):
+    """`request.user` built from the access token claims."""
+
+    @cached_property
+    def role(self) -> str | None:
+        return self.token.get("role")
+
+    @cached_property
+    def is_active(self) -> bool:  # type: ignore[override]
+        return self.token.get("is_active", True)
+
+
+class StatelessJWTAuthentication(JWTStatelessUserAuthentication):
+    def get_user(self, validated_token):
+        user = super().get_user(validated_token)
+
+        if not user.is_active:
+            raise AuthenticationFailed("User is inactive", code="user_inactive")
+
+        return user
+
+
+def authenticate_request(request, allow_query_token: bool = False) -> TokenUser | None:
+    """The user of the plain Django (non-DRF) request, e.g. the streams.
+
+    `EventSource` can't send headers, so the streams may accept `?token=`.
+    Only there: the URLs end up in logs and browser history.
+    """
+
+    authentication = StatelessJWTAuthentication()
+
+    try:
+        raw_token = request.GET.get("token") if allow_query_token else None
+        if raw_token is None:
+            result = authentication.authenticate(request)
+            return result[0] if result is not None else None
+
+        return authentication.get_user(authentication.get_validated_token(raw_token))
+    except (AuthenticationFailed, InvalidToken):
+        return None
+
+
+def get_user(user_id: int) -> User:
+    """The user record, cached in the process for `USER_CACHE_TTL` seconds."""
+
+    key = str(user_id)
+    serializer = get_serializer()
+
+    if settings.USER_CACHE_TTL and (raw := _users.get(key)) is not None:
+        return User(**serializer.loads(raw))
+
+    user = User.objects.only(*USER_CACHE_FIELDS).get(id=user_id)
+
+    if settings.USER_CACHE_TTL:
+        _users.set(
+            key,
+            serializer.dumps({name: getattr(user, name) for name in USER_CACHE_FIELDS}),
+        )
+
+    return user
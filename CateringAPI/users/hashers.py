@@ -0,0 +1,50 @@
+"""
+Password hashers with the cost parameters taken from the settings.
+
+The hashing cost is paid on every registration and login, so it is tuned
+per environment (see `benchmark_hashers`) instead of Django's defaults:
+
+    DJANGO_PASSWORD_HASHER=argon2
+    DJANGO_PASSWORD_ARGON2_TIME_COST=2
+    DJANGO_PASSWORD_ARGON2_MEMORY_COST=19456
+
+The algorithm names are the same as Django's ones, so existing hashes are
+still verified, and re-hashed with the new parameters on the next login.
+"""
+
+from django.conf import settings
+from django.contrib.auth import hashers
+
+
+class Argon2PasswordHasher(hashers.Argon2PasswordHasher):
+    @property
+    def time_cost(self) -> int:  # type: ignore[override]
+        return settings.PASSWORD_ARGON2_TIME_COST
+
+    @property
+    def memory_cost(self) -> int:  # type: ignore[override]
+        return settings.PASSWORD_ARGON2_MEMORY_COST
+
+    @property
+    def parallelism(self) -> int:  # type: ignore[override]
+        return settings.PASSWORD_ARGON2_PARALLELISM
+
+
+class ScryptPasswordHasher(hashers.ScryptPasswordHasher):
+    @property
+    def work_factor(self) -> int:  # type: ignore[override]
+        return settings.PASSWORD_SCRYPT_WORK_FACTOR
+
+    @property
+    def block_size(self) -> int:  # type: ignore[override]
+        return settings.PASSWORD_SCRYPT_BLOCK_SIZE
+
+    @property
+    def parallelism(self) -> int:  # type: ignore[override]
+        return settings.PASSWORD_SCRYPT_PARALLELISM
+
+
+class PBKDF2PasswordHasher(hashers.PBKDF2PasswordHasher):
+    @property
+    def iterations(self) -> int:  # type: ignore[override]
+        return settings.PASSWORD_PBKDF2_ITERATIONS
@@ -0,0 +1,51 @@
+import time
+
+from django.conf import settings
+from django.contrib.auth.hashers import get_hashers
+from django.core.management.base import BaseCommand
+
+
+class Command(BaseCommand):
+    help = "Measure the cost of the configured password hashers on this machine"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--repeat",
+            type=int,
+            default=10,
+            help="How many times every password is hashed, the median is shown",
+        )
+
+    def handle(self, *args, **options):
+        self.stdout.write(f"{'algorithm':<16}{'hash, ms':>10}{'verify, ms':>12}")
+
+        for hasher in get_hashers():
+            try:
+                # the algorithm library (argon2-cffi) might be not installed
+                hasher.encode("Benchmark-password-1", hasher.salt())
+            except ValueError as error:
+                self.stderr.write(f"{hasher.algorithm:<16}skipped: {error}")
+                continue
+
+            hash_times: list[float] = []
+            verify_times: list[float] = []
+
+            for _ in range(options["repeat"]):
+                start = time.perf_counter()
+                encoded = hasher.encode("Benchmark-password-1", hasher.salt())
+                hash_times.append(time.perf_counter() - start)
+
+                start = time.perf_counter()
+                hasher.verify("Benchmark-password-1", encoded)
+                verify_times.append(time.perf_counter() - start)
+
+            hash_ms = sorted(hash_times)[len(hash_times) // 2] * 1000
+            verify_ms = sorted(verify_times)[len(verify_times) // 2] * 1000
+            self.stdout.write(
+                f"{hasher.algorithm:<16}{hash_ms:>10.1f}{verify_ms:>12.1f}"
+            )
+
+        self.stdout.write(
+            f"New passwords are hashed with `{settings.PASSWORD_HASHER}`, "
+            "one CPU core handles ~1000 / <hash, ms> registrations per second"
+        )
@@ -0,0 +1,34 @@
+from django.contrib.auth.hashers import make_password
+from django.core.management.base import BaseCommand
+
+from users.models import Role, User
+
+
+class Command(BaseCommand):
+    help = "Create active customers for load tests: load-<N>@catering.com"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--count", type=int, default=100)
+        parser.add_argument("--password", default="Load-test-password-1")
+
+    def handle(self, *args, **options):
+        # the same hash for all users, hashing is the slowest part
+        password = make_password(options["password"])
+
+        users = User.objects.bulk_create(
+            [
+                User(
+                    email=f"load-{number}@catering.com",
+                    phone_number=f"{number:010}",
+                    first_name="Load",
+                    last_name=f"Test {number}",
+                    password=password,
+                    role=Role.CUSTOMER,
+                    is_active=True,
+                )
+                for number in range(options["count"])
+            ],
+            ignore_conflicts=True,
+        )
+
+        self.stdout.write(f"{len(users)} load test users are ready")
@@ -0,0 +1,111 @@
+import contextlib
+import socket
+import time
+
+from django.core.mail import get_connection
+from django.core.mail.backends.base import BaseEmailBackend
+from django.core.management.base import BaseCommand
+
+from shared.mail import MAIL_QUEUE, Mail, mail_queue_stats, retry_mail
+from shared.queue import Message, QueueService
+
+
+class Command(BaseCommand):
+    help = "Send queued emails in batches over one SMTP connection"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=50,
+            help="How many emails are taken from the queue at once",
+        )
+        parser.add_argument(
+            "--retry-delay",
+            type=float,
+            default=5,
+            help="Seconds to wait when the whole batch failed (SMTP is down)",
+        )
+        parser.add_argument(
+            "--consumer",
+            default=socket.gethostname(),
+            help="Unique worker name, used to recover unsent emails",
+        )
+        parser.add_argument(
+            "--stats",
+            action="store_true",
+            help="Show the queue depth and exit",
+        )
+
+    def handle(self, *args, **options):
+        if options["stats"]:
+            for name, depth in mail_queue_stats().items():
+                self.stdout.write(f"{name}: {depth}")
+            return
+
+        queue = QueueService()
+        consumer: str = options["consumer"]
+
+        recovered = queue.recover(name=MAIL_QUEUE, consumer=consumer)
+        if recovered:
+            self.stdout.write(f"{recovered} unsent emails returned to the queue")
+
+        self.stdout.write(f"Mail dispatcher {consumer} is waiting for emails...")
+
+        connection = get_connection(fail_silently=False)
+
+        while True:
+            message = queue.pop(name=MAIL_QUEUE, consumer=consumer)
+            if message is None:
+                # do not keep the idle SMTP connection open
+                self.close(connection)
+                continue
+
+            messages = [
+                message,
+                *queue.pop_many(
+                    name=MAIL_QUEUE, consumer=consumer, count=options["batch_size"] - 1
+                ),
+            ]
+            sent = self.send(queue, connection, messages)
+
+            stats = mail_queue_stats()
+            self.stdout.write(
+                f"Sent {sent}/{len(messages)} emails. "
+                f"Pending: {stats['pending']}, dead: {stats['dead']}"
+            )
+
+            if sent == 0:
+                time.sleep(options["retry_delay"])
+
+    def send(
+        self, queue: QueueService, connection: BaseEmailBackend, messages: list[Message]
+    ) -> int:
+        """Send emails one by one over the same connection, failed are retried."""
+
+        sent = 0
+
+        for message in messages:
+            mail = Mail(**message.value)
+
+            try:
+                # no-op if the connection is already open
+                connection.open()
+                connection.send_messages([mail.to_email_message()])
+            except Exception as error:
+                self.stderr.write(f"Email to {mail.recipient_list} failed: {error}")
+                if not retry_mail(mail, error, queue=queue):
+                    self.stderr.write(f"Email to {mail.recipient_list} is dead")
+                # the connection might be broken, the next email reconnects
+                self.close(connection)
+            else:
+                sent += 1
+            finally:
+                queue.ack(message)
+
+        return sent
+
+    @staticmethod
+    def close(connection: BaseEmailBackend) -> None:
+        with contextlib.suppress(Exception):
+            connection.close()
@@ -0,0 +1,37 @@
+from django.core.management.base import BaseCommand
+
+from users.models import User
+from users.services import ActivationService
+
+
+class Command(BaseCommand):
+    help = "Send new activation links to inactive users"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "emails",
+            nargs="*",
+            help="Users emails, all inactive users if not specified",
+        )
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=1000,
+            help="How many links are created with one query",
+        )
+
+    def handle(self, *args, **options):
+        emails: list[str] = options["emails"] or list(
+            User.objects.filter(is_active=False)
+            .order_by("id")
+            .values_list("email", flat=True)
+        )
+        batch_size: int = options["batch_size"]
+        service = ActivationService()
+        total = 0
+
+        for start in range(0, len(emails), batch_size):
+            batch = emails[start:start + batch_size]
+            total += service.resend_activation_links(batch)
+
+        self.stdout.write(f"{total} activation links sent")
@@ -1,9 +1,11 @@
 import uuid
 from shared.cache import CacheService
+from shared.mail import Mail, send_mails_later
 
-from django.core.mail import send_mail
 from .models import User
 
+ACTIVATION_KEY_TTL = 800
+
 
 class ActivationService:
     UUID_NAMESPACE = uuid.uuid4()
@@ -34,41 +36,75 @@ class ActivationService:
             namespace="activation",
             key=activation_key,
             value={"user_id": user_id},
-            ttl=800,
+            ttl=ACTIVATION_KEY_TTL,
         )
 
         return None
 
-    def send_user_activation_email(self, activation_key: str):
-        if self.email is None:
-            raise ValueError(f"No email specified for user activation process")
-
-        # SMTP Client Send Email Request
+    @staticmethod
+    def build_activation_email(email: str, activation_key: str) -> Mail:
         activation_link = f"https://frontend.catering.com/activation/{activation_key}"
-        send_mail(
+
+        return Mail(
             subject="User Activation",
             message=f"Please, activate your account: {activation_link}",
             from_email="admin@catering.com",
-            recipient_list=[self.email],
+            recipient_list=[email],
         )
 
+    def send_user_activation_email(self, activation_key: str):
+        if self.email is None:
+            raise ValueError(f"No email specified for user activation process")
+
+        # the email is sent by the `dispatch_mail` worker
+        send_mails_later([self.build_activation_email(self.email, activation_key)])
+
     def activate_user(self, activation_key: str) -> None:
-        user_cache_payload: dict | None = self.cache.get(
+        # the key is taken and removed atomically, so it can be used only once
+        user_cache_payload: dict | None = self.cache.pop(
             namespace="activation",
-            key=activation_key,
+            key=str(activation_key),
         )
 
         if user_cache_payload is None:
             raise ValueError("No payload in cache")
 
-        user = User.objects.get(id=user_cache_payload["user_id"])
-        user.is_active = True
-        user.save()
-
-        # or for instance:
-        # User.objects.filter(id=user...).update(is_active=True)
+        # one UPDATE, the user is not loaded
+        User.objects.filter(id=user_cache_payload["user_id"], is_active=False).update(
+            is_active=True
+        )
 
     def resend_activation_link(self, email: str) -> None:
         """Send user activation link to specified email."""
 
-        raise NotImplementedError
+        self.resend_activation_links([email])
+
+    def resend_activation_links(self, emails: list[str]) -> int:
+        """Send new activation links to inactive users with the emails.
+
+        Unknown and already active emails are skipped. Every batch costs
+        one SELECT and two Redis round trips (keys and mails).
+
+        Returns the number of sent links.
+        """
+
+        users: list[tuple[int, str]] = list(
+            User.objects.filter(email__in=emails, is_active=False).values_list(
+                "id", "email"
+            )
+        )
+        keys = {str(self.create_activation_key()): user for user in users}
+
+        self.cache.set_many(
+            namespace="activation",
+            mapping={key: {"user_id": user_id} for key, (user_id, _) in keys.items()},
+            ttl=ACTIVATION_KEY_TTL,
+        )
+        send_mails_later(
+            [
+                self.build_activation_email(email, key)
+                for key, (_, email) in keys.items()
+            ]
+        )
+
+        return len(keys)
@@ -1,3 +1,271 @@
-from django.test import TestCase
+import io
+from dataclasses import asdict
+from unittest import mock
 
-# Create your tests here.
+from django.contrib.auth.hashers import get_hasher, identify_hasher, make_password
+from django.core import mail as outbox
+from django.core.cache import cache
+from django.core.mail import get_connection
+from django.test import TestCase, override_settings
+from rest_framework_simplejwt.tokens import AccessToken
+
+from shared.mail import MAIL_MAX_ATTEMPTS, Mail, send_mail_later
+from shared.queue import QueueService
+
+from . import authentication
+from .management.commands.dispatch_mail import Command as DispatchMailCommand
+from .models import Role, User
+from .services import ActivationService
+from .throttling import ActivationResendEmailThrottle, ActivationResendThrottle
+
+
+class FailingBackend:
+    """Locmem backend that fails for `broken@catering.com`."""
+
+    def __init__(self):
+        self.backend = get_connection("django.core.mail.backends.locmem.EmailBackend")
+
+    def open(self):
+        return self.backend.open()
+
+    def close(self):
+        return self.backend.close()
+
+    def send_messages(self, messages):
+        if "broken@catering.com" in messages[0].to:
+            raise ConnectionError("Mailbox is unavailable")
+        return self.backend.send_messages(messages)
+
+
+# the mails of the tests never go to the working queues
+MAIL_QUEUE = "test:mail"
+MAIL_DEAD_LETTER_QUEUE = "test:mail:dead"
+
+
+class MailQueueMixin:
+    """The mails go to the test queues, which are removed after the test."""
+
+    def setUp(self):
+        super().setUp()
+        self.queue = QueueService()
+
+        for name, value in (
+            ("MAIL_QUEUE", MAIL_QUEUE),
+            ("MAIL_DEAD_LETTER_QUEUE", MAIL_DEAD_LETTER_QUEUE),
+        ):
+            patcher = mock.patch(f"shared.mail.{name}", value)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+        self.addCleanup(
+            self.queue.connection.delete,
+            self.queue._build_key(MAIL_QUEUE),
+            self.queue._build_key(MAIL_DEAD_LETTER_QUEUE),
+            self.queue._build_processing_key(MAIL_QUEUE, "test"),
+        )
+
+
+class DispatchMailTestCase(MailQueueMixin, TestCase):
+
+    def test_mails_are_sent_in_batch_and_failed_are_retried(self):
+        send_mail_later("Hello", "Text", ["john@catering.com"])
+        send_mail_later("Hello", "Text", ["broken@catering.com"])
+        send_mail_later("Hello", "Text", ["marta@catering.com"])
+
+        messages = self.queue.pop_many(MAIL_QUEUE, consumer="test", count=10)
+        sent = DispatchMailCommand(stderr=io.StringIO()).send(
+            self.queue, FailingBackend(), messages
+        )
+
+        self.assertEqual(sent, 2)
+        self.assertEqual(
+            [message.to for message in outbox.outbox],
+            [["john@catering.com"], ["marta@catering.com"]],
+        )
+        # acknowledged, the failed one is back to the queue
+        self.assertEqual(self.queue.recover(MAIL_QUEUE, consumer="test"), 0)
+        retried = self.queue.pop(MAIL_QUEUE, consumer="test", timeout=1)
+        self.assertEqual(retried.value["attempts"], 1)
+
+    def test_mail_is_dead_after_all_attempts(self):
+        mail = Mail("Hello", "Text", ["broken@catering.com"])
+        mail.attempts = MAIL_MAX_ATTEMPTS - 1
+        self.queue.push(MAIL_QUEUE, asdict(mail))
+
+        messages = self.queue.pop_many(MAIL_QUEUE, consumer="test", count=10)
+        DispatchMailCommand(stderr=io.StringIO()).send(
+            self.queue, FailingBackend(), messages
+        )
+
+        self.assertEqual(self.queue.depth(MAIL_QUEUE), 0)
+        self.assertEqual(self.queue.depth(MAIL_DEAD_LETTER_QUEUE), 1)
+
+
+class PasswordRehashTestCase(TestCase):
+    @override_settings(PASSWORD_PBKDF2_ITERATIONS=1000)
+    def setUp(self):
+        self.user = User.objects.create(
+            email="john@catering.com",
+            phone_number="0990000002",
+            first_name="John",
+            last_name="Doe",
+            password=make_password("Secret-password-1", hasher="pbkdf2_sha256"),
+            is_active=True,
+        )
+
+    def test_old_password_hash_is_upgraded_on_login(self):
+        response = self.client.post(
+            "/auth/token/",
+            {"email": "john@catering.com", "password": "Secret-password-1"},
+        )
+
+        self.assertEqual(response.status_code, 200)
+        self.user.refresh_from_db()
+        # hashed with the preferred hasher and the current parameters
+        self.assertEqual(
+            identify_hasher(self.user.password).algorithm, get_hasher().algorithm
+        )
+        self.assertFalse(get_hasher().must_update(self.user.password))
+        self.assertTrue(self.user.check_password("Secret-password-1"))
+
+
+class StatelessAuthenticationTestCase(TestCase):
+    def setUp(self):
+        authentication._users.clear()
+        self.user = User.objects.create(
+            email="john@catering.com",
+            phone_number="0990000002",
+            first_name="John",
+            last_name="Doe",
+            password=make_password("Secret-password-1"),
+            is_active=True,
+        )
+
+    def test_token_claims_and_cached_profile(self):
+        response = self.client.post(
+            "/auth/token/",
+            {"email": "john@catering.com", "password": "Secret-password-1"},
+        )
+        token = AccessToken(response.data["access"])
+        self.assertEqual(token["role"], Role.CUSTOMER)
+        self.assertTrue(token["is_active"])
+
+        headers = {"Authorization": f"Bearer {token}"}
+        self.client.get("/users/", headers=headers)
+
+        # the user record is taken from the local cache
+        with self.assertNumQueries(0):
+            response = self.client.get("/users/", headers=headers)
+
+        self.assertEqual(response.data["email"], "john@catering.com")
+
+    def test_refreshed_token_has_the_current_claims(self):
+        response = self.client.post(
+            "/auth/token/",
+            {"email": "john@catering.com", "password": "Secret-password-1"},
+        )
+        refresh = response.data["refresh"]
+
+        User.objects.filter(id=self.user.pk).update(role=Role.ADMIN)
+        response = self.client.post("/auth/token/refresh/", {"refresh": refresh})
+        self.assertEqual(AccessToken(response.data["access"])["role"], Role.ADMIN)
+
+        User.objects.filter(id=self.user.pk).update(is_active=False)
+        response = self.client.post("/auth/token/refresh/", {"refresh": refresh})
+        self.assertEqual(response.status_code, 401)
+
+
+class ActivationTestCase(MailQueueMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        self.users = User.objects.bulk_create(
+            [
+                User(
+                    email=f"user{i}@catering.com",
+                    phone_number=f"09900000{i:02}",
+                    first_name="John",
+                    last_name="Doe",
+                    is_active=False,
+                )
+                for i in range(3)
+            ]
+        )
+
+    def test_activation_key_is_used_once_with_one_query(self):
+        service = ActivationService()
+        key = str(service.create_activation_key())
+        service.save_activation_information(
+            user_id=self.users[0].pk, activation_key=key
+        )
+
+        # UPDATE only
+        with self.assertNumQueries(1):
+            response = self.client.post("/users/activate/", {"key": key})
+
+        self.assertEqual(response.status_code, 204)
+        self.assertTrue(User.objects.get(id=self.users[0].pk).is_active)
+
+        response = self.client.post("/users/activate/", {"key": key})
+        self.assertEqual(response.status_code, 400)
+
+    def test_resend_activation_links_in_bulk(self):
+        User.objects.filter(id=self.users[1].pk).update(is_active=True)
+        emails = [user.email for user in self.users] + ["unknown@catering.com"]
+
+        with self.assertNumQueries(1):
+            sent = ActivationService().resend_activation_links(emails)
+
+        self.assertEqual(sent, 2)
+        self.assertEqual(self.queue.depth(MAIL_QUEUE), 2)
+
+        # every sent link activates its user
+        for message in self.queue.pop_many(MAIL_QUEUE, consumer="test", count=2):
+            self.queue.ack(message)
+            key = message.value["message"].rsplit("/", 1)[-1]
+            response = self.client.post("/users/activate/", {"key": key})
+            self.assertEqual(response.status_code, 204)
+
+        self.assertEqual(User.objects.filter(is_active=False).count(), 0)
+
+
+class ResendActivationThrottleTestCase(MailQueueMixin, TestCase):
+    url = "/users/activation/resend/"
+
+    def setUp(self):
+        super().setUp()
+        self.addCleanup(
+            cache.delete_many,
+            [
+                "throttle_activation_resend_127.0.0.1",
+                "throttle_activation_resend_email_john@catering.com",
+                "throttle_activation_resend_email_marta@catering.com",
+            ],
+        )
+
+    def test_resends_are_limited_per_email(self):
+        limit = ActivationResendEmailThrottle().num_requests
+
+        for _ in range(limit):
+            response = self.client.post(self.url, {"email": "john@catering.com"})
+            self.assertEqual(response.status_code, 202)
+
+        # the same mailbox in another case
+        response = self.client.post(self.url, {"email": "John@Catering.com "})
+        self.assertEqual(response.status_code, 429)
+
+        response = self.client.post(self.url, {"email": "marta@catering.com"})
+        self.assertEqual(response.status_code, 202)
+
+    def test_resends_are_limited_per_client(self):
+        limit = ActivationResendThrottle().num_requests
+        emails = [f"user{i}@catering.com" for i in range(limit + 1)]
+        self.addCleanup(
+            cache.delete_many,
+            [f"throttle_activation_resend_email_{email}" for email in emails],
+        )
+
+        statuses = [
+            self.client.post(self.url, {"email": email}).status_code for email in emails
+        ]
+
+        self.assertEqual(statuses, [202] * limit + [429])
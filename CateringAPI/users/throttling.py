@@ -0,0 +1,35 @@
+"""
+The limits of the public endpoints that send mails.
+
+Both limits apply, so neither a client nor a mailbox can be flooded:
+
+    throttle_activation_resend_127.0.0.1            // per client IP
+    throttle_activation_resend_email_john@mail.com  // per email
+
+The history is kept in the default Django cache (Redis), shared by all
+processes. The rates are `REST_FRAMEWORK["DEFAULT_THROTTLE_RATES"]`.
+"""
+
+from rest_framework.throttling import SimpleRateThrottle
+
+
+class ActivationResendThrottle(SimpleRateThrottle):
+    scope = "activation_resend"
+
+    def get_cache_key(self, request, view):
+        return self.cache_format % {
+            "scope": self.scope,
+            "ident": self.get_ident(request),
+        }
+
+
+class ActivationResendEmailThrottle(SimpleRateThrottle):
+    scope = "activation_resend_email"
+
+    def get_cache_key(self, request, view):
+        email = request.data.get("email")
+        if not isinstance(email, str) or not email:
+            # invalid, the serializer rejects it
+            return None
+
+        return self.cache_format % {"scope": self.scope, "ident": email.strip().lower()}
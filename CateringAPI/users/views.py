@@ -4,12 +4,13 @@ from django.contrib.auth.hashers import make_password
 from rest_framework import permissions, routers, serializers, viewsets
 from rest_framework.request import Request
 from rest_framework.response import Response
-from rest_framework_simplejwt.authentication import JWTAuthentication
 from rest_framework.decorators import action
 from rest_framework.exceptions import ValidationError
 
+from .authentication import StatelessJWTAuthentication, get_user
 from .models import User
 from .services import ActivationService
+from .throttling import ActivationResendEmailThrottle, ActivationResendThrottle
 
 
 class UserSerializer(serializers.ModelSerializer):
@@ -41,19 +42,29 @@ class UserActivationSerializer(serializers.Serializer):
     key = serializers.UUIDField()
 
 
+class UserActivationResendSerializer(serializers.Serializer):
+    email = serializers.EmailField()
+
+
 class UsersAPIViewSet(viewsets.GenericViewSet):
-    authentication_classes = [JWTAuthentication]
+    authentication_classes = [StatelessJWTAuthentication]
 
     def get_permissions(self):
         if self.action == "create":
             return [permissions.AllowAny()]
-        elif self.action == "activate":
+        elif self.action in ("activate", "resend_activation"):
             return [permissions.AllowAny()]
         else:
             return [permissions.IsAuthenticated()]
 
+    def get_throttles(self):
+        if self.action == "resend_activation":
+            return [ActivationResendThrottle(), ActivationResendEmailThrottle()]
+        else:
+            return super().get_throttles()
+
     def list(self, request: Request):
-        return Response(UserSerializer(request.user).data, status=200)
+        return Response(UserSerializer(get_user(request.user.id)).data, status=200)
 
     def create(self, request: Request):
         serializer = UserSerializer(data=request.data)
@@ -76,7 +87,7 @@ class UsersAPIViewSet(viewsets.GenericViewSet):
     @action(methods=["POST"], detail=False)
     def activate(self, request: Request) -> Response:
         serializer = UserActivationSerializer(data=request.data)
-        serializer.is_valid()
+        serializer.is_valid(raise_exception=True)
 
         activation_service = ActivationService()
         try:
@@ -88,6 +99,18 @@ class UsersAPIViewSet(viewsets.GenericViewSet):
 
         return Response(data=None, status=204)
 
+    @action(methods=["POST"], detail=False, url_path="activation/resend")
+    def resend_activation(self, request: Request) -> Response:
+        serializer = UserActivationResendSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+
+        ActivationService().resend_activation_link(
+            email=serializer.validated_data["email"]
+        )
+
+        # the same response for any email, registered emails are not disclosed
+        return Response(data=None, status=202)
+
 
 router = routers.DefaultRouter()
 router.register(r"", UsersAPIViewSet, basename="user")